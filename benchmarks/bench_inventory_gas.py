@@ -0,0 +1,48 @@
+"""Benchmark gas classification for the GHG inventory loader.
+
+Compares the per-row ``apply`` of ``_get_gas_from_category`` with the
+per-category lookup in ``_classify_gas`` on the inventory CSV repeated
+``--scale`` times (100 by default). Run from the repository root:
+
+    python -m benchmarks.bench_inventory_gas [--scale N] [--repeat R]
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from components.greenhouse_gas.data import _classify_gas, _get_gas_from_category
+
+INVENTORY_CSV = 'dataset/greenhouse_gas_inventory_data_data.csv'
+
+
+def best_of(repeat, func, *args):
+    """Return the fastest wall time of ``repeat`` calls and the last result."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=100, help='times to repeat the CSV rows')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per method, best is reported')
+    args = parser.parse_args()
+
+    categories = pd.read_csv(INVENTORY_CSV, usecols=['category'])['category']
+    categories = pd.concat([categories] * args.scale, ignore_index=True)
+    print(f"{len(categories):,} rows, {categories.nunique()} distinct categories")
+
+    apply_time, expected = best_of(args.repeat, lambda s: s.apply(_get_gas_from_category), categories)
+    lookup_time, result = best_of(args.repeat, _classify_gas, categories)
+    assert result.equals(expected.rename('gas')), 'vectorized classification differs from apply'
+
+    print(f"apply:  {apply_time:8.3f}s")
+    print(f"lookup: {lookup_time:8.3f}s  ({apply_time / lookup_time:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark the sea-ice loader on a synthetic seaice.csv.
+
+Writes a file in the layout of ``dataset/seaice.csv`` (irregular spaces,
+multi-file 'Source Data' lists containing commas, a few malformed lines),
+then times the previous python-engine loader against ``_read_sea_ice_csv``.
+The synthetic file and the quarantine report of its malformed lines go to a
+temporary directory, so ``.cache/quarantine`` is left alone. Run from the
+repository root:
+
+    python -m benchmarks.bench_sea_ice [--rows N] [--skip-legacy] [--keep FILE]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from components.sea_levels import data as sea_levels
+
+HEADER = 'Year, Month, Day,     Extent,    Missing, Source Data,hemisphere\n'
+
+
+def write_synthetic(path, rows, seed=0):
+    """Write ``rows`` daily observations (plus ~0.01% malformed lines) to ``path``."""
+    rng = np.random.default_rng(seed)
+    days = np.datetime64('1978-10-26') + np.arange(rows) // 2
+    dates = pd.DatetimeIndex(days)
+    extent = rng.normal(12, 3, rows).round(3)
+    source = np.where(rng.random(rows) < 0.1,
+                      "['ftp://sidads/north/nt_a.bin', 'ftp://sidads/north/nt_b.bin']",
+                      "['ftp://sidads/north/nt_a.bin']")
+    df = pd.DataFrame({
+        'Year': dates.year,
+        'Month': dates.month.astype(str).str.pad(3),  # stray spaces like the real file
+        'Day': dates.day,
+        'Extent': extent,
+        'Missing': 0.0,
+        'Source Data': source,
+        'hemisphere': np.where(np.arange(rows) % 2, 'south', 'north'),
+    })
+    with open(path, 'w') as f:
+        f.write(HEADER)
+        df.to_csv(f, header=False, index=False, quoting=3, escapechar='\\')
+        for i in range(max(rows // 10_000, 1)):
+            f.write(f'bad line {i},1\n')
+
+
+def read_legacy(path):
+    """The loader this benchmark replaces (python engine, per-row date parsing)."""
+    col_names = ['Year', 'Month', 'Day', 'Extent', 'Missing', 'Source Data', 'hemisphere']
+    df = pd.read_csv(path, header=0, names=col_names, skipinitialspace=True, engine='python', on_bad_lines='skip')
+    df.columns = [col.strip() for col in df.columns]
+    parts = df[['Year', 'Month', 'Day']].apply(pd.to_numeric, errors='coerce')
+    df['Date'] = pd.to_datetime(parts, errors='coerce')
+    df['DayOfYear'] = df['Date'].dt.dayofyear
+    df['Extent'] = pd.to_numeric(df['Extent'], errors='coerce')
+    return df.dropna(subset=['Date', 'Extent'])
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000, help='rows in the synthetic file')
+    parser.add_argument('--skip-legacy', action='store_true', help='only time the new loader')
+    parser.add_argument('--keep', help='write the synthetic file here and keep it')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The malformed lines are quarantined next to the synthetic file, not in .cache
+        sea_levels.QUARANTINE_DIR = os.path.join(tmp, 'quarantine')
+        path = args.keep or os.path.join(tmp, 'seaice.csv')
+        elapsed, _ = timed(write_synthetic, path, args.rows)
+        print(f"wrote {args.rows:,} rows ({os.path.getsize(path) / 1e6:.0f} MB) in {elapsed:.1f}s")
+
+        new_time, df = timed(sea_levels._read_sea_ice_csv, path)
+        print(f"C parser:      {new_time:8.2f}s  {len(df):,} rows, {df.memory_usage(deep=True).sum() / 1e6:.0f} MB")
+        if not args.skip_legacy:
+            old_time, legacy = timed(read_legacy, path)
+            print(f"python engine: {old_time:8.2f}s  {len(legacy):,} rows, "
+                  f"{legacy.memory_usage(deep=True).sum() / 1e6:.0f} MB  ({old_time / new_time:.1f}x slower)")
+            # on_bad_lines='skip' also drops every row whose 'Source Data' lists several files
+            print(f"legacy loader lost {len(df) - len(legacy):,} valid rows")
+        assert len(df) == args.rows, 'valid rows were dropped'
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,15 @@
-from dash import callback, Input, Output
-import plotly.express as px
+from dash import callback, Input, Output, Patch, State, no_update
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
-from .data import load_air_quality_data, get_cities
+from components.downsample import downsample_frame, relayout_x_range
+from .data import city_readings, get_cities, get_city_index
+from .distribution import distribution_figure
+from .rolling import rolling_stats
+from .scoring import build_composite_map
+
+# Samples in the centred rolling window of the time series
+TIMESERIES_WINDOW = 30
 
 @callback(
     Output('aq-city-dropdown', 'options'),
@@ -17,40 +24,123 @@ def set_cities_options(selected_country):
     value = cities[0] if cities else None
     return options, value
 
+@callback(
+    Output('aq-global-map', 'figure'),
+    Input('aq-score-normalization', 'value'),
+    Input('aq-score-weighting', 'value'),
+    prevent_initial_call=True
+)
+def update_composite_map(normalization, weighting):
+    """Swap in the cached choropleth of the selected scoring."""
+    if not normalization or not weighting:
+        return no_update
+    return build_composite_map(normalization, weighting)
+
+def _city_series(city, metric):
+    """Rows of ``city`` by date with the 30-day rolling mean and std of ``metric``."""
+    city_df = get_city_index().city_rows(city)
+    stats = rolling_stats(city, metric, TIMESERIES_WINDOW)
+    if stats is None or len(stats[0]) != len(city_df):
+        # Store not built yet: compute this city's window here
+        rolling = city_df[metric].rolling(window=TIMESERIES_WINDOW, center=True, min_periods=1)
+        stats = rolling.mean(), rolling.std()
+    mean, std = (np.asarray(values) for values in stats)
+    return city_df.assign(smoothed=mean, std=std)
+
+def _zoomed_series(city, metric, x_range):
+    """Like :func:`_city_series`, reading only the readings around the visible window.
+
+    The window is widened until it holds half a rolling window of readings on
+    each side (or reaches the ends of the record), so the rolling statistics
+    match those of the full series.
+    """
+    start, end = (pd.Timestamp(x) for x in x_range)
+    first, last = get_city_index().city_rows(city)['date'].agg(['min', 'max'])
+    if pd.isna(first):
+        return _city_series(city, metric)
+    half = TIMESERIES_WINDOW // 2
+    margin = max(end - start, pd.Timedelta(days=1))
+    while True:
+        city_df = city_readings(city, start - margin, end + margin, [metric])
+        dates = city_df['date']
+        if (((dates < start).sum() >= half or start - margin <= first)
+                and ((dates > end).sum() >= half or end + margin >= last)):
+            break
+        margin *= 4
+    rolling = city_df[metric].rolling(window=TIMESERIES_WINDOW, center=True, min_periods=1)
+    return city_df.assign(smoothed=rolling.mean(), std=rolling.std())
+
+def _timeseries_traces(city_df, x_range=None):
+    """x/y of the band and rolling-mean traces, downsampled to the point budget."""
+    shown = downsample_frame(city_df, 'date', 'smoothed', x_range=x_range)
+    x = shown['date']
+    return [(x, shown['smoothed'] + shown['std']), (x, shown['smoothed'] - shown['std']), (x, shown['smoothed'])]
+
+def _metric_label(metric):
+    return f"{metric.replace('_', ' ').title()} (µg/m³)" if 'pm' in metric or 'co' in metric else metric.replace('_', ' ').title()
+
 @callback(
     Output('aq-timeseries-plot', 'figure'),
-    Output('aq-boxplot', 'figure'),
     Input('aq-city-dropdown', 'value'),
     Input('aq-metric-dropdown', 'value')
 )
 def update_air_quality_graphs(city, metric):
     if not city or not metric:
-        empty_fig = go.Figure(layout={'paper_bgcolor': '#4482C1', 'plot_bgcolor': '#4482C1'})
-        return empty_fig, empty_fig
+        return go.Figure(layout={'paper_bgcolor': '#4482C1', 'plot_bgcolor': '#4482C1'})
 
-    df = load_air_quality_data()
-    city_df = df[df['city'] == city].sort_values(by='date')
-    metric_label = f"{metric.replace('_', ' ').title()} (µg/m³)" if 'pm' in metric or 'co' in metric else metric.replace('_', ' ').title()
+    city_df = _city_series(city, metric)
+    metric_label = _metric_label(metric)
 
     # Enhanced Time Series
-    city_df['smoothed'] = city_df[metric].rolling(window=30, center=True, min_periods=1).mean()
-    city_df['std'] = city_df[metric].rolling(window=30, center=True, min_periods=1).std()
-    
+    (x_upper, upper), (x_lower, lower), (x_mean, smoothed) = _timeseries_traces(city_df)
     ts_fig = go.Figure()
-    ts_fig.add_trace(go.Scatter(x=city_df['date'], y=city_df['smoothed'] + city_df['std'], mode='lines', line=dict(width=0), showlegend=False))
-    ts_fig.add_trace(go.Scatter(x=city_df['date'], y=city_df['smoothed'] - city_df['std'], mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(0,114,178,0.2)', name='±1 Std Dev'))
-    ts_fig.add_trace(go.Scatter(x=city_df['date'], y=city_df['smoothed'], mode='lines', line=dict(color='#0072B2', width=3), name='30-Day Rolling Mean'))
+    ts_fig.add_trace(go.Scatter(x=x_upper, y=upper, mode='lines', line=dict(width=0), showlegend=False))
+    ts_fig.add_trace(go.Scatter(x=x_lower, y=lower, mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(0,114,178,0.2)', name='±1 Std Dev'))
+    ts_fig.add_trace(go.Scatter(x=x_mean, y=smoothed, mode='lines', line=dict(color='#0072B2', width=3), name='30-Day Rolling Mean'))
     
     min_point = city_df.loc[city_df[metric].idxmin()]
     max_point = city_df.loc[city_df[metric].idxmax()]
     ts_fig.add_trace(go.Scatter(x=[min_point['date'], max_point['date']], y=[min_point[metric], max_point[metric]], mode='markers+text', marker=dict(size=8, color='red'), text=['Min', 'Max'], textposition='top center', showlegend=False))
     
-    ts_fig.update_layout(title=f'{metric_label} Over Time in {city}', yaxis_title=metric_label)
+    # uirevision keeps a zoom while the traces are re-sampled, and resets it for a new selection
+    ts_fig.update_layout(title=f'{metric_label} Over Time in {city}', yaxis_title=metric_label, uirevision=f'{city}:{metric}')
+    ts_fig.update_layout(paper_bgcolor="white", plot_bgcolor="#f8f9fa", font_color="black")
+    return ts_fig
 
-    # Violin Plot for Distribution
-    violin_fig = px.violin(city_df, y=metric, box=True, points="all", title=f'Distribution of {metric_label} in {city}')
-    
-    for fig in [ts_fig, violin_fig]:
-        fig.update_layout(paper_bgcolor="white", plot_bgcolor="#f8f9fa", font_color="black")
+@callback(
+    Output('aq-boxplot', 'figure'),
+    Input('aq-city-dropdown', 'value'),
+    Input('aq-metric-dropdown', 'value'),
+    Input('aq-violin-points', 'value')
+)
+def update_air_quality_distribution(city, metric, points):
+    """Violin and box of the city's readings from precomputed summaries; raw samples only when asked for."""
+    if not city or not metric:
+        return go.Figure(layout={'paper_bgcolor': '#4482C1', 'plot_bgcolor': '#4482C1'})
+    metric_label = _metric_label(metric)
+    violin_fig = distribution_figure(city, metric, f'Distribution of {metric_label} in {city}',
+                                     show_points='points' in (points or []))
+    violin_fig.update_layout(yaxis_title=metric_label, paper_bgcolor="white", plot_bgcolor="#f8f9fa", font_color="black")
+    return violin_fig
 
-    return ts_fig, violin_fig 
\ No newline at end of file
+@callback(
+    Output('aq-timeseries-plot', 'figure', allow_duplicate=True),
+    Input('aq-timeseries-plot', 'relayoutData'),
+    State('aq-city-dropdown', 'value'),
+    State('aq-metric-dropdown', 'value'),
+    prevent_initial_call=True
+)
+def redensify_air_quality_timeseries(relayout, city, metric):
+    """Re-sample the time series traces for the zoomed window."""
+    x_range = relayout_x_range(relayout)
+    if x_range is None or not city or not metric:
+        return no_update
+    if None in x_range:
+        city_df = _city_series(city, metric)
+    else:
+        city_df = _zoomed_series(city, metric, x_range)
+    patch = Patch()
+    for i, (x, y) in enumerate(_timeseries_traces(city_df, x_range)):
+        patch['data'][i]['x'] = x.to_numpy()
+        patch['data'][i]['y'] = y.to_numpy()
+    return patch
@@ -1,31 +1,113 @@
-import pandas as pd
+import threading
 from functools import lru_cache
 
-@lru_cache(maxsize=1)
-def load_air_quality_data():
-    """Load, clean, and cache the air quality dataset."""
+import numpy as np
+import pandas as pd
+
+from components.cache import cached
+from components.frame_cache import cached_frame, source_version
+from components.reshape import wide_to_long
+from components.shared import freeze_frame
+from .index import CityIndex
+from .ingest import BATCH_FILE, current_batch, normalize_air_quality, read_partitions
+
+AIR_QUALITY_CSV = 'dataset/global_air_quality_data_10000.csv'
+DEATH_BY_AIR_CSV = 'dataset/deathbyair.csv'
+DEATH_RATE_MEASURES = {
+    'Total': 'Air pollution (total)',
+    'Indoor': 'Indoor air pollution',
+    'PM': 'Outdoor particulate matter',
+    'Ozone': 'Outdoor ozone pollution',
+}
+
+def data_version():
+    """Returns a key that changes whenever the air quality file changes or a batch is ingested."""
+    return source_version(AIR_QUALITY_CSV, BATCH_FILE)
+
+def _load_base():
+    def build():
+        return normalize_air_quality(pd.read_csv(AIR_QUALITY_CSV))
+
     try:
-        df = pd.read_csv('dataset/global_air_quality_data_10000.csv')
-        # Standardize column names
-        df.columns = [col.lower().replace(' ', '_').replace('.', '') for col in df.columns]
-        df['date'] = pd.to_datetime(df['date'])
+        return cached_frame('air_quality', [AIR_QUALITY_CSV], build)
     except FileNotFoundError:
         print("Error: The file 'dataset/global_air_quality_data_10000.csv' was not found.")
-        return pd.DataFrame()
     except Exception as e:
         print(f"An error occurred while loading the data: {e}")
-        return pd.DataFrame()
-    return df
+    return pd.DataFrame()
+
+@lru_cache(maxsize=1)
+def _base_data(version):
+    """The base CSV and its per-city index."""
+    df = freeze_frame(_load_base())
+    return df, CityIndex(df)
+
+# The combined frame and index as of the last batch this process has seen
+_combined = {'base': None, 'batch': 0, 'df': None, 'index': None}
+_combined_lock = threading.Lock()
+
+def _refresh_combined():
+    """Bring the combined frame and index up to the latest batch, reading only the parts not seen yet."""
+    base_version = source_version(AIR_QUALITY_CSV)
+    with _combined_lock:
+        if _combined['base'] != base_version:
+            df, index = _base_data(base_version)
+            _combined.update(base=base_version, batch=0, df=df, index=index)
+        batch = current_batch()
+        if batch > _combined['batch']:
+            new = read_partitions(after=_combined['batch'], batch=batch)
+            if not new.empty:
+                _combined['df'] = freeze_frame(pd.concat([_combined['df'], new], ignore_index=True))
+                _combined['index'] = _combined['index'].extend(new)
+            _combined['batch'] = batch
+        return _combined['df'], _combined['index']
+
+def load_air_quality_data():
+    """Load, clean, and cache the air quality dataset.
+
+    Batches ingested with :mod:`components.air_quality.ingest` follow the
+    rows of the base CSV, oldest batch first. Each new batch is appended to
+    the frame kept from the previous call.
+    """
+    return _refresh_combined()[0]
+
+def get_city_index():
+    """Return the per-city index of the current air quality data (extended as batches arrive)."""
+    return _refresh_combined()[1]
+
+def city_readings(city, start=None, end=None, columns=None):
+    """Readings of ``city`` between ``start`` and ``end`` (inclusive) ordered by date.
+
+    Rows of the base CSV are sliced from its per-city index; ingested rows
+    come from :func:`~components.air_quality.ingest.read_partitions`, which
+    opens only the days in the window. ``columns`` limits the measurements.
+    """
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    base = _base_data(source_version(AIR_QUALITY_CSV))[1].city_rows(city)
+    if start is not None or end is not None:
+        # The index orders dates as int64, which puts rows without a date first
+        keys = base['date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        lo = keys.searchsorted((pd.Timestamp.min if start is None else start).as_unit('ns').value, side='left')
+        hi = len(keys) if end is None else keys.searchsorted(end.as_unit('ns').value, side='right')
+        base = base.iloc[lo:hi]
+    if columns is not None:
+        base = base[[c for c in dict.fromkeys(['city', 'date'] + list(columns)) if c in base.columns]]
+    ingested = read_partitions(start, end, cities=[city], columns=columns)
+    if end is not None and not ingested.empty:
+        ingested = ingested[ingested['date'] <= end]
+    if ingested.empty:
+        return base.reset_index(drop=True)
+    # Stable, so rows of the same date keep the base-then-batch order of the index
+    return pd.concat([base, ingested], ignore_index=True).sort_values('date', kind='stable', ignore_index=True)
 
 def get_countries():
     """Return a sorted list of unique countries."""
-    df = load_air_quality_data()
-    return sorted(df['country'].unique())
+    return list(get_city_index().countries)
 
 def get_cities(country):
     """Return a sorted list of unique cities for a given country."""
-    df = load_air_quality_data()
-    return sorted(df[df['country'] == country]['city'].unique())
+    return get_city_index().cities_of(country)
 
 def get_metrics():
     """Return a list of metrics available for visualization, excluding temperature."""
@@ -94,19 +176,11 @@ def get_deaths_by_risk_factor_data():
     df = pd.DataFrame(data, columns=["Risk Factor", "Deaths"])
     return df
 
+@cached(version=lambda: source_version(DEATH_BY_AIR_CSV))
 def get_death_rate_by_pollution_type():
     """Return a DataFrame with death rate from air pollution by type (country/region, 1990 & 2021) from deathbyair.csv."""
-    df = pd.read_csv('dataset/deathbyair.csv')
-    # Build a long-form DataFrame for 1990 and 2021
-    records = []
-    for _, row in df.iterrows():
-        for year in [1990, 2021]:
-            records.append({
-                'Country or region': row['Country or region'],
-                'Year': year,
-                'Air pollution (total)': row[f'Total_{year}'],
-                'Indoor air pollution': row[f'Indoor_{year}'],
-                'Outdoor particulate matter': row[f'PM_{year}'],
-                'Outdoor ozone pollution': row[f'Ozone_{year}'],
-            })
-    return pd.DataFrame(records) 
\ No newline at end of file
+    # Columns are <type>_<year>, e.g. PM_1990; one row per country and year
+    def build():
+        return wide_to_long(pd.read_csv(DEATH_BY_AIR_CSV), 'Country or region', measures=DEATH_RATE_MEASURES)
+
+    return cached_frame('death_rate_by_pollution_type', [DEATH_BY_AIR_CSV], build)
@@ -0,0 +1,116 @@
+"""Compact distribution figure for one city's readings of one metric.
+
+``px.violin(..., points='all')`` embeds every sample of the city in the
+figure and leaves the density estimate and the jittered points to the
+browser. Here the server summarizes the samples once per (city, metric) and
+data version (:func:`city_distribution`):
+
+* a Gaussian kernel density estimate on ``KDE_POINTS`` values, using
+  Silverman's bandwidth (as plotly's violins do). The samples are first
+  binned onto a fine grid, so the cost is linear in the number of samples.
+* the quartiles, the Tukey fences (the most extreme samples within 1.5 IQR
+  of the box) and the mean.
+
+The figure draws the density as a filled outline and the box from the
+precomputed statistics, so its size does not depend on the number of
+samples. Raw samples are added only on request, and then at most
+``AQ_MAX_RAW_POINTS`` (default 500) of them, drawn evenly from the sorted
+values.
+"""
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+from components.cache import cached
+from .data import city_readings, data_version
+
+KDE_POINTS = 128
+# Bins the samples are counted into before the kernel is applied
+KDE_BINS = 1024
+MAX_RAW_POINTS = int(os.environ.get('AQ_MAX_RAW_POINTS', 500))
+
+
+def _bandwidth(values, q1, q3):
+    """Silverman's rule-of-thumb bandwidth."""
+    n = len(values)
+    std = values.std(ddof=1) if n > 1 else 0.0
+    spread = min(std, (q3 - q1) / 1.349) if q3 > q1 else std
+    bandwidth = 1.059 * spread * n ** -0.2
+    # Constant samples still get a visible (narrow) shape
+    return bandwidth if bandwidth > 0 else max(abs(float(values[0])), 1.0) * 1e-3
+
+
+def kde(values, bandwidth, points=KDE_POINTS):
+    """(grid, density) of a Gaussian KDE over ``values`` from min - 2 bw to max + 2 bw."""
+    low, high = values.min() - 2 * bandwidth, values.max() + 2 * bandwidth
+    counts, edges = np.histogram(values, bins=KDE_BINS, range=(low, high))
+    centres = (edges[:-1] + edges[1:]) / 2
+    grid = np.linspace(low, high, points)
+    kernel = np.exp(-0.5 * ((grid[:, None] - centres[None, :]) / bandwidth) ** 2)
+    density = kernel @ counts / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density
+
+
+def summarize(values):
+    """Quartiles, fences, mean, KDE and evenly spaced sorted samples of ``values``."""
+    values = np.sort(np.asarray(values, dtype=float))
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    # Fences sit on the most extreme samples inside 1.5 IQR, as in a plotly box
+    lower = values[np.searchsorted(values, q1 - 1.5 * iqr, side='left')]
+    upper = values[np.searchsorted(values, q3 + 1.5 * iqr, side='right') - 1]
+    grid, density = kde(values, _bandwidth(values, q1, q3))
+    sample = values[np.unique(np.linspace(0, len(values) - 1, min(len(values), MAX_RAW_POINTS)).astype(np.int64))]
+    summary = {'n': len(values), 'q1': q1, 'median': median, 'q3': q3, 'lowerfence': lower, 'upperfence': upper,
+               'mean': values.mean(), 'grid': grid, 'density': density, 'sample': sample}
+    for value in summary.values():
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+    return summary
+
+
+@cached(version=data_version)
+def city_distribution(city, metric):
+    """Distribution summary of ``metric`` in ``city`` (None without readings)."""
+    rows = city_readings(city, columns=[metric])
+    if metric not in rows.columns:
+        return None
+    return summarize(rows[metric].to_numpy())
+
+
+def distribution_figure(city, metric, title, show_points=False):
+    """Violin outline, box and optionally a capped sample of the raw readings of ``metric`` in ``city``."""
+    summary = city_distribution(city, metric)
+    fig = go.Figure()
+    if summary is None:
+        fig.update_layout(title=title)
+        return fig
+
+    half_width = 0.4 * summary['density'] / summary['density'].max()
+    fig.add_trace(go.Scatter(
+        x=np.concatenate([half_width, -half_width[::-1]]),
+        y=np.concatenate([summary['grid'], summary['grid'][::-1]]),
+        mode='lines', fill='toself', line=dict(color='#636efa', width=1), fillcolor='rgba(99, 110, 250, 0.4)',
+        hoverinfo='skip', showlegend=False
+    ))
+    fig.add_trace(go.Box(
+        x=[0], q1=[summary['q1']], median=[summary['median']], q3=[summary['q3']],
+        lowerfence=[summary['lowerfence']], upperfence=[summary['upperfence']], mean=[summary['mean']],
+        width=0.1, fillcolor='white', line=dict(color='#636efa'), name=f"n = {summary['n']:,}", showlegend=False
+    ))
+    if show_points:
+        sample = summary['sample']
+        jitter = np.random.default_rng(0).uniform(-0.3, 0.3, len(sample))
+        fig.add_trace(go.Scatter(
+            x=jitter, y=sample, mode='markers', marker=dict(size=3, color='#636efa', opacity=0.5),
+            name=f'{len(sample):,} of {summary["n"]:,} readings', hoverinfo='y', showlegend=False
+        ))
+    fig.update_layout(
+        title=title,
+        xaxis=dict(visible=False, range=[-0.5, 0.5])
+    )
+    return fig
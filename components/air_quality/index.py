@@ -0,0 +1,114 @@
+"""Per-city index over the air-quality readings.
+
+The country and city dropdowns and the city charts all look rows up by
+name. :class:`CityIndex` sorts the readings once by (city, date) and keeps
+the offset where each city starts, so a city's history is a contiguous,
+already date-ordered slice. The countries and each country's cities are
+collected in the same pass. Every lookup then costs the size of its answer,
+not a scan of the whole feed.
+
+:meth:`CityIndex.extend` adds newly ingested rows by merging them into the
+sorted order, so a new batch costs its own sort plus one pass over the
+existing rows.
+"""
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from components.shared import freeze_frame
+
+
+class CityIndex:
+    """Air-quality rows grouped into contiguous per-city slices sorted by date."""
+
+    def __init__(self, df: pd.DataFrame):
+        if df.empty or 'city' not in df.columns:
+            df = pd.DataFrame(columns=['country', 'city', 'date'])
+        city_codes, cities = pd.factorize(df['city'], sort=True)
+        # Rows without a city sort first (code -1) and are left out of every slice
+        order = np.lexsort((_date_keys(df), city_codes))
+
+        pairs = pd.DataFrame({'country': df['country'].to_numpy(), 'city': city_codes}).dropna()
+        pairs = pairs[pairs['city'] >= 0].drop_duplicates().sort_values(['country', 'city'])
+        cities_of = {country: [cities[code] for code in group['city']]
+                     for country, group in pairs.groupby('country', sort=True)}
+        self._assign(df.iloc[order], order, list(cities),
+                     np.searchsorted(city_codes[order], np.arange(len(cities) + 1)), cities_of)
+
+    def _assign(self, sorted_df, source_rows, cities, offsets, cities_of):
+        self.df = freeze_frame(sorted_df.reset_index(drop=True))
+        # Position of each indexed row in the source frame
+        self.source_rows = source_rows
+        self.cities = cities
+        self._city_code = {city: code for code, city in enumerate(self.cities)}
+        self.offsets = offsets
+        self._cities_of = cities_of
+        self.countries = list(self._cities_of)
+
+    def extend(self, df: pd.DataFrame) -> 'CityIndex':
+        """A new index over the indexed rows followed by the rows of ``df``.
+
+        The result equals ``CityIndex(pd.concat([source, df]))``: rows of
+        ``df`` go after the existing rows of the same city and date, and their
+        ``source_rows`` continue after the existing ones.
+        """
+        if df.empty or 'city' not in df.columns:
+            return self
+        new = CityIndex(df)
+        cities = sorted(set(self.cities).union(new.cities))
+        code = {city: i for i, city in enumerate(cities)}
+
+        def group_sizes(index):
+            # Rows per city in the merged coding, rows without a city first
+            sizes = np.zeros(len(cities) + 1, dtype=np.int64)
+            sizes[0] = index.offsets[0]
+            sizes[[code[city] + 1 for city in index.cities]] = np.diff(index.offsets)
+            return sizes
+
+        old_sizes, new_sizes = group_sizes(self), group_sizes(new)
+        old_starts = np.concatenate([[0], np.cumsum(old_sizes)])
+        new_starts = np.concatenate([[0], np.cumsum(new_sizes)])
+        old_dates, new_dates = _date_keys(self.df), _date_keys(new.df)
+
+        # Where each new row goes among the existing rows: after those of its city with an earlier or equal date
+        insert_at = np.empty(len(new.df), dtype=np.int64)
+        for group in np.flatnonzero(new_sizes):
+            lo, hi = old_starts[group], old_starts[group + 1]
+            a, b = new_starts[group], new_starts[group + 1]
+            insert_at[a:b] = lo + np.searchsorted(old_dates[lo:hi], new_dates[a:b], side='right')
+
+        n_old = len(self.df)
+        is_new = np.zeros(n_old + len(new.df), dtype=bool)
+        is_new[insert_at + np.arange(len(new.df))] = True
+        take = np.empty(len(is_new), dtype=np.int64)
+        take[~is_new] = np.arange(n_old)
+        take[is_new] = n_old + np.arange(len(new.df))
+
+        source_rows = np.concatenate([self.source_rows, new.source_rows + len(self.source_rows)])[take]
+        cities_of = {country: sorted(set(self._cities_of.get(country, ())).union(new._cities_of.get(country, ())))
+                     for country in sorted(set(self._cities_of).union(new._cities_of))}
+        merged = object.__new__(CityIndex)
+        merged._assign(pd.concat([self.df, new.df], ignore_index=True).iloc[take], source_rows, cities,
+                       np.cumsum(old_sizes + new_sizes), cities_of)
+        return merged
+
+    def city_codes(self) -> np.ndarray:
+        """City code of every indexed row (-1 for rows without a city)."""
+        counts = np.diff(self.offsets)
+        return np.concatenate([np.full(self.offsets[0], -1), np.repeat(np.arange(len(self.cities)), counts)])
+
+    def cities_of(self, country: str) -> List[str]:
+        """Sorted cities with readings in ``country``."""
+        return list(self._cities_of.get(country, ()))
+
+    def city_rows(self, city: str) -> pd.DataFrame:
+        """Rows of ``city`` ordered by date (read-only)."""
+        code = self._city_code.get(city)
+        if code is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[self.offsets[code]:self.offsets[code + 1]]
+
+
+def _date_keys(df):
+    return pd.to_datetime(df['date']).to_numpy(dtype='datetime64[ns]').view(np.int64)
@@ -0,0 +1,209 @@
+"""Append-only ingestion of new air-quality measurements.
+
+New readings arrive as CSV or NDJSON batches, e.g. an hourly feed. A batch
+is cleaned the same way as the base CSV, split by calendar day and written
+as one Feather file per day it touches::
+
+    dataset/air_quality/date=2024-05-01/part-0000000042.feather
+
+Files are never rewritten. Every batch gets the next sequence number, which
+names its part files and is recorded in ``dataset/air_quality/_batch`` after
+all of them are in place. That file is the invalidation signal. Its stat
+changes the air-quality :func:`~components.air_quality.data.data_version`,
+so running workers notice the new batch on their next request. Workers read
+only the parts they have not seen yet and only parts of completed batches,
+never re-reading the history. Ordering the parts by sequence number means
+new rows always follow the old ones. :func:`read_partitions` serves range
+queries, reading only the days in the requested window. Parts are written
+uncompressed and read memory-mapped, with the city filter and column
+selection applied before they are converted to pandas, so nothing is kept
+in memory between reads.
+
+``AQ_PARTITION_DIR`` moves the partition directory. Ingest from the command
+line with ``python -m components.air_quality.ingest batch.csv more.ndjson``
+(``-`` reads standard input, with ``--format``).
+"""
+import argparse
+import glob
+import logging
+import os
+import re
+import sys
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional for the app, but ingestion needs it
+    pa = None
+    pc = None
+    feather = None
+
+try:
+    import fcntl
+except ImportError:  # fcntl is POSIX only; concurrent ingestion then needs external serialization
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PARTITION_DIR = os.environ.get('AQ_PARTITION_DIR', os.path.join('dataset', 'air_quality'))
+BATCH_FILE = os.path.join(PARTITION_DIR, '_batch')
+REQUIRED_COLUMNS = ['city', 'country', 'date']
+
+_PART = re.compile(r'date=(\d{4}-\d{2}-\d{2})[\\/]part-(\d+)\.feather$')
+
+
+def normalize_air_quality(df):
+    """Standardize column names (``PM2.5`` -> ``pm25``, ``Wind Speed`` -> ``wind_speed``) and parse dates."""
+    df = df.rename(columns=lambda col: col.strip().lower().replace(' ', '_').replace('.', ''))
+    return df.assign(date=pd.to_datetime(df['date'], errors='coerce'))
+
+
+def read_batch(source, fmt=None):
+    """Read one batch (a path or file object) as CSV or NDJSON into a cleaned frame."""
+    if fmt is None:
+        name = source if isinstance(source, str) else getattr(source, 'name', '')
+        fmt = 'ndjson' if str(name).endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+    if fmt == 'csv':
+        df = pd.read_csv(source)
+    elif fmt == 'ndjson':
+        df = pd.read_json(source, lines=True, convert_dates=False)
+    else:
+        raise ValueError(f"Unknown batch format {fmt!r}; expected 'csv' or 'ndjson'")
+
+    df = normalize_air_quality(df)
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Batch is missing required columns: {', '.join(missing)}")
+    # One schema for every part: naive timestamps, text keys and float measurements
+    if df['date'].dt.tz is not None:
+        df = df.assign(date=df['date'].dt.tz_convert('UTC').dt.tz_localize(None))
+    measurements = [col for col in df.columns if col not in REQUIRED_COLUMNS]
+    df = df.astype({'city': str, 'country': str}).assign(
+        **{col: pd.to_numeric(df[col], errors='coerce').astype('float64') for col in measurements})
+    dropped = int(df['date'].isna().sum())
+    if dropped:
+        logger.warning(f"Dropping {dropped} row(s) without a valid date from the batch")
+        df = df[df['date'].notna()]
+    return df
+
+
+def ingest(df):
+    """Append the cleaned frame ``df`` as a new batch; returns its sequence number (0 if empty)."""
+    if feather is None:
+        raise RuntimeError("Ingesting air-quality batches requires pyarrow")
+    if df.empty:
+        return 0
+    os.makedirs(PARTITION_DIR, exist_ok=True)
+    with _batch_lock():
+        batch = current_batch() + 1
+        days = df['date'].dt.strftime('%Y-%m-%d')
+        for day, part in df.groupby(days, sort=True):
+            directory = os.path.join(PARTITION_DIR, f'date={day}')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'part-{batch:010d}.feather')
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            feather.write_feather(pa.Table.from_pandas(part.reset_index(drop=True), preserve_index=False), tmp_path,
+                                  compression='uncompressed')
+            os.replace(tmp_path, path)
+        # Publishing the sequence number last makes the whole batch visible at once
+        tmp_batch = f'{BATCH_FILE}.{os.getpid()}.tmp'
+        with open(tmp_batch, 'w') as f:
+            f.write(str(batch))
+        os.replace(tmp_batch, BATCH_FILE)
+    logger.info(f"Ingested batch {batch}: {len(df):,} rows over {days.nunique()} day(s)")
+    return batch
+
+
+def current_batch():
+    """Sequence number of the last completely ingested batch (0 when none)."""
+    try:
+        with open(BATCH_FILE) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def list_parts(start=None, end=None, batch=None, after=0):
+    """``(day, sequence, path)`` of the part files of completed batches, in sequence order.
+
+    ``start`` and ``end`` (inclusive dates) restrict the listing to those
+    days' directories. Only batches after ``after`` and up to ``batch``
+    (default: :func:`current_batch`) are listed.
+    """
+    batch = current_batch() if batch is None else batch
+    start = None if start is None else pd.Timestamp(start).strftime('%Y-%m-%d')
+    end = None if end is None else pd.Timestamp(end).strftime('%Y-%m-%d')
+    parts = []
+    for directory in glob.glob(os.path.join(PARTITION_DIR, 'date=*')):
+        day = os.path.basename(directory)[len('date='):]
+        if (start is not None and day < start) or (end is not None and day > end):
+            continue
+        for path in glob.glob(os.path.join(directory, 'part-*.feather')):
+            match = _PART.search(path)
+            if match and after < int(match.group(2)) <= batch:
+                parts.append((day, int(match.group(2)), path))
+    return sorted(parts, key=lambda part: (part[1], part[0]))
+
+
+def _read_part(path, cities=None, columns=None):
+    table = feather.read_table(path, memory_map=True)
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    if cities is not None:
+        table = table.filter(pc.is_in(table['city'], value_set=pa.array(cities, type=table.schema.field('city').type)))
+    return table.to_pandas()
+
+
+def read_partitions(start=None, end=None, cities=None, columns=None, after=0, batch=None):
+    """Ingested rows between the dates ``start`` and ``end`` (inclusive), in ingestion order.
+
+    Only the day directories in the window are opened. ``cities`` limits the
+    rows and ``columns`` the columns returned; ``after`` and ``batch`` select
+    the batches as in :func:`list_parts`.
+    """
+    if feather is None:
+        return pd.DataFrame()
+    cities = None if cities is None else [str(city) for city in cities]
+    if columns is not None:
+        columns = list(dict.fromkeys(['city', 'date'] + list(columns)))
+    frames = [_read_part(path, cities, columns) for _, _, path in list_parts(start, end, batch, after)]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    if start is not None:
+        df = df[df['date'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['date'] < pd.Timestamp(end).normalize() + pd.Timedelta(days=1)]
+    return df.reset_index(drop=True)
+
+
+@contextmanager
+def _batch_lock():
+    """Hold an exclusive lock on the partition directory while a batch is written."""
+    with open(os.path.join(PARTITION_DIR, '_batch.lock'), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Append air-quality batches to the partitioned store.')
+    parser.add_argument('batches', nargs='+', help="CSV or NDJSON files ('-' for standard input)")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='batch format (default: from the file extension)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    for source in args.batches:
+        df = read_batch(sys.stdin if source == '-' else source, args.format or ('csv' if source == '-' else None))
+        ingest(df)
+
+
+if __name__ == '__main__':
+    main()
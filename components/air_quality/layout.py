@@ -1,69 +1,14 @@
 from dash import dcc, html
-import plotly.express as px
-import pandas as pd
-import numpy as np
 
-from .data import get_countries, get_metrics, load_air_quality_data
+from .data import get_countries, get_metrics
 # Import the new data function
 from .data import get_deaths_by_age_data
 # Import the new data function
 from .data import get_deaths_by_risk_factor_data
 from .data import get_death_rate_by_pollution_type
+from .scoring import NORMALIZATIONS, WEIGHTINGS, build_composite_map
 import plotly.graph_objects as go
 
-# ------------------------------------------------------------------
-# Build choropleth of composite air quality (considering all pollutants)
-# ------------------------------------------------------------------
-
-aq_df = load_air_quality_data()
-# Guard against empty
-if not aq_df.empty:
-    # Get all pollutants
-    pollutants = ['pm25', 'pm10', 'so2', 'no2', 'co', 'o3']
-    
-    # Calculate mean for each pollutant by country
-    country_means = {}
-    for pollutant in pollutants:
-        means = aq_df.groupby('country')[pollutant].mean()
-        # Normalize each pollutant (0-1 scale)
-        if not means.empty:
-            min_val = means.min()
-            max_val = means.max()
-            if max_val > min_val:  # Avoid division by zero
-                means = (means - min_val) / (max_val - min_val)
-            country_means[pollutant] = means
-    
-    # Create composite score (average of normalized pollutants)
-    composite_scores = pd.DataFrame()
-    for pollutant in pollutants:
-        if pollutant in country_means:
-            if composite_scores.empty:
-                composite_scores = country_means[pollutant].to_frame('score')
-            else:
-                composite_scores['score'] += country_means[pollutant]
-    
-    if not composite_scores.empty:
-        composite_scores['score'] /= len(pollutants)
-        composite_scores = composite_scores.reset_index()
-        
-        fig_aq_map = px.choropleth(
-            composite_scores,
-            locations='country',
-            locationmode='country names',
-            color='score',
-            color_continuous_scale='Blues',  # Now darker = worse air quality
-            range_color=(0, 1),
-            labels={'score': 'Air Quality Score<br>(Higher = Worse)'},
-            title='Composite Air Quality by Country<br>(Considering PM2.5, PM10, SO2, NO2, CO, O3)'
-        )
-        fig_aq_map.update_layout(
-            geo=dict(showframe=False, showcoastlines=True, projection_type='natural earth'),
-            margin=dict(l=0, r=0, t=50, b=0)
-        )
-else:
-    fig_aq_map = px.choropleth(title='Air quality data not available')
-
-
 def create_layout():
     countries = get_countries()
     metrics = get_metrics()
@@ -133,7 +78,23 @@ def create_layout():
 
         # Choropleth Map section
         html.Div([
-            dcc.Graph(id='aq-global-map', figure=fig_aq_map, style={'height': '600px'})
+            html.Div([
+                dcc.RadioItems(
+                    id='aq-score-normalization',
+                    options=[{'label': label, 'value': value} for value, label in NORMALIZATIONS.items()],
+                    value='minmax',
+                    inline=True,
+                    inputStyle={'marginLeft': '15px', 'marginRight': '5px'}
+                ),
+                dcc.RadioItems(
+                    id='aq-score-weighting',
+                    options=[{'label': label, 'value': value} for value, (label, _) in WEIGHTINGS.items()],
+                    value='equal',
+                    inline=True,
+                    inputStyle={'marginLeft': '15px', 'marginRight': '5px'}
+                ),
+            ], style={'display': 'flex', 'justifyContent': 'center', 'gap': '40px', 'fontSize': '16px', 'color': 'black'}),
+            dcc.Graph(id='aq-global-map', figure=build_composite_map('minmax', 'equal'), style={'height': '600px'})
         ], style={'padding': '20px', 'backgroundColor': 'white', 'borderRadius': '15px', 'margin': '20px'}),
 
         # Controls
@@ -162,6 +123,13 @@ def create_layout():
         # Visualizations
         html.Div([
             dcc.Graph(id='aq-timeseries-plot'),
+            dcc.Checklist(
+                id='aq-violin-points',
+                options=[{'label': 'Show raw readings (sampled)', 'value': 'points'}],
+                value=[],
+                inputStyle={'marginRight': '5px'},
+                style={'textAlign': 'right', 'color': 'white'}
+            ),
             dcc.Graph(id='aq-boxplot'),
         ], style={'padding': '20px'}),
 
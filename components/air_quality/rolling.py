@@ -0,0 +1,299 @@
+"""Precomputed rolling statistics for the air-quality time series.
+
+The city chart draws a centred rolling mean and standard deviation of the
+selected metric. Instead of computing them on every dropdown change, the
+mean and std of every metric in :func:`get_metrics` are computed for every
+city in one grouped pass per window. The rows are in :class:`CityIndex`
+order and stored as one Feather file under ``.cache/air_quality/``. The chart
+callback reads a city's slice of the memory-mapped columns directly.
+
+Windows come from ``AQ_ROLLING_WINDOWS`` (comma separated, default ``30``).
+The store is built by a background thread the first time it is missing or
+stale, and the chart computes the statistics itself until it is ready. It
+can also be built ahead of time with ``python -m components.air_quality.rolling``.
+
+When the source only gained rows at the end (new ingested batches, or rows
+appended to the CSV with its old content unchanged), the update is
+incremental. For each city, only the rows from ``max(window)``
+positions before its first new row are recomputed, and everything earlier
+is copied from the previous store.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from components.frame_cache import CACHE_DIR, cache_enabled
+from components.shared import freeze_frame
+from .data import AIR_QUALITY_CSV, data_version, get_city_index, get_metrics
+from .ingest import current_batch
+
+try:
+    import fcntl
+except ImportError:  # fcntl is POSIX only; without it concurrent builds just repeat the work
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.path.join(CACHE_DIR, 'air_quality')
+STORE_PATH = os.path.join(STORE_DIR, 'rolling.feather')
+MANIFEST_PATH = os.path.join(STORE_DIR, 'rolling.json')
+# Bump when the statistics change so stored copies are rebuilt
+STORE_VERSION = 1
+WINDOWS = tuple(sorted({int(w) for w in os.environ.get('AQ_ROLLING_WINDOWS', '30').split(',') if w.strip()}))
+
+
+def column_name(metric, stat, window):
+    """Store column of ``stat`` ('mean' or 'std') of ``metric`` over ``window`` rows."""
+    return f'{metric}_{stat}{window}'
+
+
+def compute_rolling(df, codes, metrics, windows):
+    """Centred rolling mean and std of ``metrics`` per group of ``codes``.
+
+    ``df`` must hold each group's rows contiguously and in date order; the
+    result has one row per row of ``df``, in the same order.
+    """
+    if not len(df):
+        return pd.DataFrame({column_name(m, stat, w): np.empty(0) for w in windows for stat in ('mean', 'std')
+                             for m in metrics})
+    columns = {}
+    grouped = df[metrics].reset_index(drop=True).groupby(codes, sort=False)
+    for window in windows:
+        rolling = grouped.rolling(window, center=True, min_periods=1)
+        for stat, values in (('mean', rolling.mean()), ('std', rolling.std())):
+            values = values.droplevel(0)
+            if not np.array_equal(values.index, np.arange(len(df))):
+                values = values.sort_index()
+            for metric in metrics:
+                columns[column_name(metric, stat, window)] = values[metric].to_numpy()
+    return pd.DataFrame(columns, index=range(len(df)))
+
+
+class RollingStore:
+    """Rolling statistics aligned with the rows of a :class:`CityIndex`."""
+
+    def __init__(self, df, cities, offsets):
+        self.df = freeze_frame(df)
+        self._city_code = {city: code for code, city in enumerate(cities)}
+        self.offsets = offsets
+
+    def city_stats(self, city, metric, window):
+        """(mean, std) arrays for ``city``, or None when the store does not have them."""
+        code = self._city_code.get(city)
+        mean, std = column_name(metric, 'mean', window), column_name(metric, 'std', window)
+        if code is None or mean not in self.df.columns:
+            return None
+        rows = slice(self.offsets[code], self.offsets[code + 1])
+        return self.df[mean].to_numpy()[rows], self.df[std].to_numpy()[rows]
+
+
+def build_store(index, metrics=None, windows=WINDOWS, previous=None):
+    """Compute the statistics for ``index``, reusing ``previous`` where possible.
+
+    ``previous`` is ``(frame, cities, offsets, old_rows)`` of a store built
+    from the first ``old_rows`` rows of the same source.
+    """
+    metrics = [m for m in (metrics or get_metrics()) if m in index.df.columns]
+    codes = index.city_codes()
+    if previous is None:
+        return compute_rolling(index.df, codes, metrics, windows)
+
+    old, old_cities, old_offsets, old_rows = previous
+    n_cities = len(index.cities)
+    position = np.arange(len(index.df))
+    starts, ends = index.offsets[:-1], index.offsets[1:]
+
+    # First position of a new row in every city (its end when it has none)
+    is_new = index.source_rows >= old_rows
+    first_new = ends.copy()
+    named = is_new & (codes >= 0)
+    np.minimum.at(first_new, codes[named], position[named])
+    # Cities the previous store does not know are recomputed from their start
+    old_code = {city: code for code, city in enumerate(old_cities)}
+    previous_code = np.array([old_code.get(city, -1) for city in index.cities], dtype=np.int64)
+    first_new = np.where(previous_code >= 0, first_new, starts)
+
+    # Only rows within half the widest window of a new row change; one window
+    # more of context before them keeps their statistics exact
+    widest = max(windows)
+    changed = first_new < ends
+    context = np.where(changed, np.maximum(starts, first_new - widest), ends)
+    keep_from = np.where(changed, np.maximum(starts, first_new - (widest - widest // 2)), ends)
+
+    row_city = np.maximum(codes, 0)
+    recompute = (codes >= 0) & (position >= context[row_city])
+    fresh = compute_rolling(index.df.iloc[position[recompute]], codes[recompute], metrics, windows)
+
+    out = {name: np.full(len(index.df), np.nan) for name in fresh.columns}
+    take_fresh = recompute & (position >= keep_from[row_city])
+    fresh_rows = np.flatnonzero(take_fresh[recompute])
+    copied = (codes >= 0) & ~take_fresh
+    old_position = old_offsets[previous_code[row_city[copied]]] + (position[copied] - starts[row_city[copied]])
+    for name, column in out.items():
+        column[take_fresh] = fresh[name].to_numpy()[fresh_rows]
+        if name in old.columns:
+            column[copied] = old[name].to_numpy()[old_position]
+    logger.info(f"Rolling stats: recomputed {int(take_fresh.sum()):,} of {len(index.df):,} rows "
+                f"in {int(changed.sum()):,} of {n_cities:,} cities")
+    return pd.DataFrame(out)
+
+
+def _file_digest(path, size):
+    digest = hashlib.sha1()
+    if not size:
+        return digest.hexdigest()
+    with open(path, 'rb') as f:
+        remaining = size
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 24))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def refresh_store(metrics=None, windows=WINDOWS):
+    """Bring the stored statistics up to date with the source file and return a :class:`RollingStore`."""
+    index = get_city_index()
+    metrics = [m for m in (metrics or get_metrics()) if m in index.df.columns]
+    version = data_version()
+
+    if not cache_enabled() or index.df.empty:
+        return RollingStore(build_store(index, metrics, windows), index.cities, index.offsets)
+
+    size = os.path.getsize(AIR_QUALITY_CSV) if os.path.exists(AIR_QUALITY_CSV) else 0
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with _store_lock():
+        manifest, stored = _read_state()
+        config = {'store': STORE_VERSION, 'metrics': metrics, 'windows': list(windows)}
+        if manifest is not None and manifest['config'] == config and manifest['version'] == version:
+            return RollingStore(stored, index.cities, index.offsets)
+
+        batch = current_batch()
+        previous = None
+        if manifest is not None and manifest['config'] == config and batch >= manifest.get('batch', 0):
+            prefix_same = (size >= manifest['size']
+                           and _file_digest(AIR_QUALITY_CSV, manifest['size']) == manifest['digest'])
+            # New rows follow the old ones when only batches were ingested, or
+            # when the CSV only grew and there are no batches after it
+            if prefix_same and (size == manifest['size'] or batch == 0):
+                previous = (stored, manifest['cities'], np.asarray(manifest['offsets']), manifest['rows'])
+        df = build_store(index, metrics, windows, previous)
+        _write_state(df, {'config': config, 'version': version, 'size': size, 'batch': batch,
+                          'digest': _file_digest(AIR_QUALITY_CSV, size), 'rows': len(index.df),
+                          'cities': index.cities, 'offsets': index.offsets.tolist()})
+    return RollingStore(df, index.cities, index.offsets)
+
+
+def _read_state():
+    try:
+        with open(MANIFEST_PATH, 'r') as f:
+            manifest = json.load(f)
+        import pyarrow.feather as feather
+        return manifest, feather.read_table(STORE_PATH, memory_map=True).to_pandas()
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring unreadable rolling stats store: {e}")
+        return None, None
+
+
+def _write_state(df, manifest):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    try:
+        tmp_path = f'{STORE_PATH}.{os.getpid()}.tmp'
+        # Uncompressed, so _read_state maps the file instead of decompressing it
+        feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, STORE_PATH)
+        # The manifest is replaced last so readers never pair it with another frame
+        tmp_manifest = f'{MANIFEST_PATH}.{os.getpid()}.tmp'
+        with open(tmp_manifest, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, MANIFEST_PATH)
+    except Exception as e:
+        logger.warning(f"Could not persist rolling stats: {e}")
+
+
+@contextmanager
+def _store_lock():
+    """Hold an exclusive lock on ``.cache/air_quality/rolling.lock`` while the store is updated."""
+    with open(os.path.join(STORE_DIR, 'rolling.lock'), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_state = {'version': None, 'store': None, 'thread': None}
+_state_lock = threading.Lock()
+
+
+def _build_in_background(version):
+    try:
+        store = refresh_store()
+    except Exception as e:
+        logger.error(f"Building rolling stats failed: {e}", exc_info=True)
+        store = None
+    with _state_lock:
+        if _state['version'] == version:
+            _state['store'] = store
+        _state['thread'] = None
+
+
+def get_rolling_store(wait=False):
+    """Return the :class:`RollingStore` for the current data, or None while it is being built.
+
+    A missing or stale store starts a background build; ``wait=True``
+    builds it in the calling thread instead.
+    """
+    version = data_version()
+    with _state_lock:
+        if _state['version'] != version:
+            _state['version'], _state['store'] = version, None
+        if _state['store'] is not None:
+            return _state['store']
+        if not wait:
+            if _state['thread'] is None:
+                _state['thread'] = threading.Thread(target=_build_in_background, args=(version,),
+                                                    name='aq-rolling-stats', daemon=True)
+                _state['thread'].start()
+            return None
+    store = refresh_store()
+    with _state_lock:
+        if _state['version'] == version:
+            _state['store'] = store
+    return store
+
+
+def rolling_stats(city, metric, window):
+    """(mean, std) of ``metric`` for ``city`` from the store, or None when not available yet."""
+    store = get_rolling_store()
+    return None if store is None else store.city_stats(city, metric, window)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the air-quality rolling statistics store.')
+    parser.add_argument('--full', action='store_true', help='rebuild from scratch instead of updating')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.full:
+        for path in (MANIFEST_PATH, STORE_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+    store = get_rolling_store(wait=True)
+    logger.info(f"Rolling stats store has {len(store.df):,} rows and {len(store.df.columns)} columns")
+
+
+if __name__ == '__main__':
+    main()
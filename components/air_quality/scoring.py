@@ -0,0 +1,125 @@
+"""Composite air-quality score per country.
+
+The means of every pollutant by country come from a single grouped
+aggregation (:func:`country_means`). Each pollutant is then put on a common
+scale with one of :data:`NORMALIZATIONS`:
+
+``minmax``
+    0 for the cleanest and 1 for the most polluted country.
+``zscore``
+    Standard deviations from the mean of all countries.
+``who``
+    Multiples of the WHO 2021 air quality guideline (:data:`WHO_GUIDELINES`),
+    so 1 means "at the guideline" whatever the other countries measure.
+
+The composite is the weighted mean of the normalized pollutants a country
+has, with weights from :data:`WEIGHTINGS`. The choropleth of every
+(normalization, weighting) pair is built once per data version and cached
+(:func:`build_composite_map`), so switching the scoring on the page only
+swaps the map.
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from components.cache import cached
+from .data import data_version, load_air_quality_data
+
+POLLUTANTS = ['pm25', 'pm10', 'so2', 'no2', 'co', 'o3']
+POLLUTANT_LABELS = {'pm25': 'PM2.5', 'pm10': 'PM10', 'so2': 'SO2', 'no2': 'NO2', 'co': 'CO', 'o3': 'O3'}
+
+# WHO 2021 guideline levels: the annual mean where there is one, else the
+# 24-hour (SO2, CO) or peak-season (O3) level. µg/m³, CO in mg/m³.
+WHO_GUIDELINES = {'pm25': 5.0, 'pm10': 15.0, 'so2': 40.0, 'no2': 10.0, 'co': 4.0, 'o3': 60.0}
+
+NORMALIZATIONS = {
+    'minmax': 'Min-max (0-1)',
+    'zscore': 'Z-score',
+    'who': 'WHO guideline ratio',
+}
+
+WEIGHTINGS = {
+    'equal': ('Equal weights', {p: 1.0 for p in POLLUTANTS}),
+    'particulates': ('Particulate focus', {'pm25': 3.0, 'pm10': 2.0, 'so2': 1.0, 'no2': 1.0, 'co': 1.0, 'o3': 1.0}),
+    'gases': ('Gas focus', {'pm25': 1.0, 'pm10': 1.0, 'so2': 2.0, 'no2': 2.0, 'co': 2.0, 'o3': 2.0}),
+}
+
+SCORE_LABELS = {
+    'minmax': 'Air Quality Score<br>(Higher = Worse)',
+    'zscore': 'Score (std. dev.)<br>(Higher = Worse)',
+    'who': 'Times WHO guideline<br>(Higher = Worse)',
+}
+
+
+@cached(version=data_version)
+def country_means():
+    """Mean of every pollutant by country (one row per country)."""
+    df = load_air_quality_data()
+    pollutants = [p for p in POLLUTANTS if p in df.columns]
+    if df.empty or 'country' not in df.columns or not pollutants:
+        return pd.DataFrame(columns=['country'] + POLLUTANTS)
+    return df.groupby('country', sort=True)[pollutants].mean().reset_index()
+
+
+def normalize(means, method='minmax'):
+    """``means`` (countries x pollutants) put on the common scale of ``method``."""
+    if method == 'minmax':
+        low, span = means.min(), means.max() - means.min()
+        # A pollutant equal everywhere carries no ranking and scores 0
+        return (means - low) / span.where(span > 0, np.inf)
+    if method == 'zscore':
+        std = means.std(ddof=0)
+        return (means - means.mean()) / std.where(std > 0, np.inf)
+    if method == 'who':
+        return means / pd.Series(WHO_GUIDELINES)[means.columns]
+    raise ValueError(f"Unknown normalization {method!r}; expected one of {sorted(NORMALIZATIONS)}")
+
+
+def composite_scores(normalization='minmax', weighting='equal'):
+    """``country``/``score`` frame: weighted mean of the normalized pollutants of each country.
+
+    Pollutants a country has no readings of are left out of its mean.
+    """
+    try:
+        weights = WEIGHTINGS[weighting][1]
+    except KeyError:
+        raise ValueError(f"Unknown weighting {weighting!r}; expected one of {sorted(WEIGHTINGS)}")
+    means = country_means().set_index('country')
+    scaled = normalize(means, normalization)
+    w = np.array([weights.get(p, 0.0) for p in scaled.columns])
+    values = scaled.to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    total = (np.where(present, values, 0.0) * w).sum(axis=1)
+    weight = (present * w).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = np.where(weight > 0, total / weight, np.nan)
+    return pd.DataFrame({'country': means.index, 'score': score})
+
+
+@cached(version=data_version)
+def build_composite_map(normalization='minmax', weighting='equal'):
+    """The composite choropleth for one scoring configuration, as a figure dict."""
+    scores = composite_scores(normalization, weighting).dropna(subset=['score'])
+    if scores.empty:
+        return px.choropleth(title='Air quality data not available').to_dict()
+
+    pollutants = ', '.join(POLLUTANT_LABELS[p] for p in POLLUTANTS)
+    title = f'Composite Air Quality by Country<br>(Considering {pollutants})'
+    if (normalization, weighting) != ('minmax', 'equal'):
+        title = (f'Composite Air Quality by Country<br>(Considering {pollutants}; '
+                 f'{NORMALIZATIONS[normalization]}, {WEIGHTINGS[weighting][0].lower()})')
+    fig = px.choropleth(
+        scores,
+        locations='country',
+        locationmode='country names',
+        color='score',
+        color_continuous_scale='Blues',  # darker = worse air quality
+        range_color=(0, 1) if normalization == 'minmax' else None,
+        labels={'score': SCORE_LABELS[normalization]},
+        title=title
+    )
+    fig.update_layout(
+        geo=dict(showframe=False, showcoastlines=True, projection_type='natural earth'),
+        margin=dict(l=0, r=0, t=50, b=0)
+    )
+    return fig.to_dict()
@@ -0,0 +1,459 @@
+"""Pluggable result cache for loaders and figure builders.
+
+Functions decorated with :func:`cached` store their results in a backend
+instead of a per-function ``lru_cache``:
+
+* ``MemoryCache``: in-process LRU bounded by an approximate byte size.
+* ``DiskCache``: files under ``.cache/kv/`` shared by every worker. DataFrames
+  are stored as Feather and read back memory-mapped, anything else is pickled.
+* ``SqliteCache``: a single-file key-value store in ``.cache/kv.sqlite``,
+  standing in for an external KV server.
+
+Every backend evicts least recently used entries once its size limit is
+exceeded, counts hits, misses and evictions (:meth:`CacheBackend.stats`) and
+supports invalidation of one namespace or everything. A versioned function
+drops the entries of its older versions the first time a process sees a new
+one.
+
+``@cached()`` uses the backend named by ``CLIMATE_CACHE_BACKEND`` (``memory``
+by default). The shared ``disk`` and ``sqlite`` backends sit behind a small
+per-process memory tier (``CLIMATE_CACHE_FRONT_MB``) so hot values are not
+read back on every call. Size limits are set with ``CLIMATE_CACHE_MEMORY_MB``,
+``CLIMATE_CACHE_DISK_MB`` and ``CLIMATE_CACHE_FRONT_MB``.
+"""
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from components.frame_cache import CACHE_DIR
+from components.shared import freeze_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # DiskCache pickles DataFrames too
+    pa = None
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+def _env_bytes(name, default_mb):
+    return int(float(os.environ.get(name, default_mb)) * 1024 * 1024)
+
+
+def sizeof(value):
+    """Approximate size of ``value`` in bytes, used for eviction."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class CacheBackend(ABC):
+    """Interface shared by the backends.
+
+    Keys are ``'<namespace>:<version>.<digest>'`` strings: the namespace names
+    the cached function, ``version`` is a digest of its data version and
+    ``digest`` one of its arguments.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """Return the value stored under ``key`` or ``MISSING``."""
+        with self._lock:
+            value = self._get(key)
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._set(key, value)
+
+    def invalidate(self, namespace=None, keep=None):
+        """Drop every entry of ``namespace``, or everything when None.
+
+        With ``keep``, entries of that version token (see :func:`version_token`)
+        are kept, so only the results of older data versions are dropped.
+        """
+        with self._lock:
+            self._invalidate(namespace, keep)
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._usage()
+        return {'backend': type(self).__name__, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
+
+    @abstractmethod
+    def _get(self, key):
+        """Return the value of ``key`` or ``MISSING``; called under the lock."""
+
+    @abstractmethod
+    def _set(self, key, value):
+        """Store ``value`` under ``key`` and evict past ``max_bytes``; called under the lock."""
+
+    @abstractmethod
+    def _invalidate(self, namespace, keep):
+        """Drop the entries selected as described in :meth:`invalidate`; called under the lock."""
+
+    @abstractmethod
+    def _usage(self):
+        """Return ``(entries, bytes)`` currently stored."""
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU bounded by the approximate size of its values."""
+
+    def __init__(self, max_bytes):
+        super().__init__(max_bytes)
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._size = 0
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _set(self, key, value):
+        size = sizeof(value)
+        self._pop(key)
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {key}: {size / 1e6:.1f} MB exceeds the {self.max_bytes / 1e6:.0f} MB limit")
+            return
+        self._entries[key] = (value, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def _invalidate(self, namespace, keep):
+        for key in [k for k in self._entries if _matches(k, namespace, keep)]:
+            self._pop(key)
+
+    def _usage(self):
+        return len(self._entries), self._size
+
+
+class DiskCache(CacheBackend):
+    """Files in ``directory``, shared by every process that uses the same directory.
+
+    File names are ``<namespace digest>-<version>.<digest>`` plus ``.feather``
+    for DataFrames or ``.pkl`` for anything else; the modification time
+    doubles as the last access time for eviction.
+    """
+
+    def __init__(self, directory, max_bytes):
+        super().__init__(max_bytes)
+        self.directory = directory
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, f'{_digest(_namespace_of(key))}-{key.rsplit(":", 1)[1]}{ext}')
+
+    def _get(self, key):
+        for ext in ('.feather', '.pkl'):
+            path = self._path(key, ext)
+            try:
+                if ext == '.feather':
+                    value = feather.read_table(path, memory_map=True).to_pandas() if feather else MISSING
+                else:
+                    with open(path, 'rb') as f:
+                        value = pickle.load(f)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable cache file {path}: {e}")
+                continue
+            if value is not MISSING:
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return value
+        return MISSING
+
+    def _set(self, key, value):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = None
+            if feather is not None and isinstance(value, pd.DataFrame):
+                try:
+                    path = self._path(key, '.feather')
+                    tmp_path = f'{path}.{os.getpid()}.tmp'
+                    # Uncompressed, so reads map the file instead of decompressing it
+                    feather.write_feather(pa.Table.from_pandas(value), tmp_path, compression='uncompressed')
+                except Exception:
+                    path = None  # e.g. mixed-type object columns; pickle instead
+            if path is None:
+                path = self._path(key, '.pkl')
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not cache {key} on disk: {e}")
+            return
+        self._evict()
+
+    def _files(self):
+        try:
+            return [e for e in os.scandir(self.directory) if e.name.endswith(('.feather', '.pkl'))]
+        except FileNotFoundError:
+            return []
+
+    def _evict(self):
+        files = sorted(self._files(), key=lambda e: e.stat().st_mtime)
+        size = sum(e.stat().st_size for e in files)
+        for entry in files:
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            size -= entry.stat().st_size
+            self.evictions += 1
+
+    def _invalidate(self, namespace, keep):
+        prefix = None if namespace is None else f'{_digest(namespace)}-'
+        kept = None if prefix is None or keep is None else f'{prefix}{keep}.'
+        for entry in self._files():
+            if (prefix is None or entry.name.startswith(prefix)) and not (kept and entry.name.startswith(kept)):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def _usage(self):
+        files = self._files()
+        return len(files), sum(e.stat().st_size for e in files)
+
+
+class SqliteCache(CacheBackend):
+    """Pickled values in one SQLite table, a local stand-in for a KV server."""
+
+    def __init__(self, path, max_bytes):
+        super().__init__(max_bytes)
+        self.path = path
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, namespace TEXT, '
+                               'value BLOB, size INTEGER, accessed REAL)')
+        return self._conn
+
+    def _get(self, key):
+        conn = self._connection()
+        row = conn.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return MISSING
+        conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    def _set(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            logger.warning(f"Not caching {key}: {len(blob) / 1e6:.1f} MB exceeds the {self.max_bytes / 1e6:.0f} MB limit")
+            return
+        conn = self._connection()
+        conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+                     (key, _namespace_of(key), blob, len(blob), time.time()))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        while total > self.max_bytes:
+            oldest, size = conn.execute('SELECT key, size FROM entries ORDER BY accessed LIMIT 1').fetchone()
+            conn.execute('DELETE FROM entries WHERE key = ?', (oldest,))
+            total -= size
+            self.evictions += 1
+
+    def _invalidate(self, namespace, keep):
+        if namespace is None:
+            self._connection().execute('DELETE FROM entries')
+        elif keep is None:
+            self._connection().execute('DELETE FROM entries WHERE namespace = ?', (namespace,))
+        else:
+            kept = f'{namespace}:{keep}.'
+            self._connection().execute('DELETE FROM entries WHERE namespace = ? AND substr(key, 1, ?) != ?',
+                                       (namespace, len(kept), kept))
+
+    def _usage(self):
+        return self._connection().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+
+
+class TieredCache(CacheBackend):
+    """A per-process ``front`` cache in front of a shared ``back`` cache."""
+
+    def __init__(self, front, back):
+        super().__init__(back.max_bytes)
+        self.front = front
+        self.back = back
+
+    def _get(self, key):
+        value = self.front.get(key)
+        if value is MISSING:
+            value = self.back.get(key)
+            if value is not MISSING:
+                self.front.set(key, value)
+        return value
+
+    def _set(self, key, value):
+        self.front.set(key, value)
+        self.back.set(key, value)
+
+    def _invalidate(self, namespace, keep):
+        self.front.invalidate(namespace, keep)
+        self.back.invalidate(namespace, keep)
+
+    def _usage(self):
+        return self.back._usage()
+
+    def stats(self):
+        stats = super().stats()
+        stats['front'] = self.front.stats()
+        return stats
+
+
+def _namespace_of(key):
+    return key.rsplit(':', 1)[0]
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def version_token(version):
+    """The part of a key that identifies the data ``version``."""
+    return _digest(repr(version))
+
+
+def _matches(key, namespace, keep):
+    if namespace is None:
+        return True
+    prefix, rest = key.rsplit(':', 1)
+    return prefix == namespace and (keep is None or not rest.startswith(f'{keep}.'))
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=None):
+    """Return the process-wide backend called ``name`` (``CLIMATE_CACHE_BACKEND`` when None)."""
+    name = name or os.environ.get('CLIMATE_CACHE_BACKEND', 'memory')
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            if name == 'memory':
+                backend = MemoryCache(_env_bytes('CLIMATE_CACHE_MEMORY_MB', 1024))
+            elif name in ('disk', 'sqlite'):
+                if name == 'disk':
+                    back = DiskCache(os.path.join(CACHE_DIR, 'kv'), _env_bytes('CLIMATE_CACHE_DISK_MB', 4096))
+                else:
+                    back = SqliteCache(os.path.join(CACHE_DIR, 'kv.sqlite'), _env_bytes('CLIMATE_CACHE_DISK_MB', 4096))
+                backend = TieredCache(MemoryCache(_env_bytes('CLIMATE_CACHE_FRONT_MB', 256)), back)
+            else:
+                raise ValueError(f"Unknown cache backend {name!r} (expected memory, disk or sqlite)")
+            _backends[name] = backend
+    return backend
+
+
+def invalidate(namespace=None):
+    """Invalidate ``namespace`` (or everything) in every backend created so far."""
+    for backend in list(_backends.values()):
+        backend.invalidate(namespace)
+
+
+def cache_stats():
+    """Return the stats of every backend created so far, keyed by backend name."""
+    return {name: backend.stats() for name, backend in list(_backends.items())}
+
+
+def cached(backend=None, version=None, namespace=None):
+    """Memoize a function in a cache backend.
+
+    ``backend`` is a backend name (see :func:`get_backend`) or instance.
+    ``version`` is a string or a callable returning one, e.g. the
+    :func:`~components.frame_cache.source_version` of the files the result is
+    built from. It becomes part of every key, so results built from older
+    files are never returned, and when a process first sees a new version
+    the entries of every other version are invalidated. Arguments must have
+    stable ``repr`` values.
+
+    The wrapper gains ``invalidate()`` (alias ``cache_clear()``) and
+    ``cache_info()``.
+    """
+    def decorator(func):
+        ns = namespace or f'{func.__module__}.{func.__qualname__}'
+        counts = {'hits': 0, 'misses': 0}
+        seen = {'version': MISSING}
+        seen_lock = threading.Lock()
+
+        def resolve():
+            return backend if isinstance(backend, CacheBackend) else get_backend(backend)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            current = version_token(version() if callable(version) else version)
+            store = resolve()
+            if version is not None and seen['version'] != current:
+                with seen_lock:
+                    if seen['version'] != current:
+                        # Results of older data versions are never read again
+                        store.invalidate(ns, keep=current)
+                        seen['version'] = current
+            key = f'{ns}:{current}.{_digest(repr((args, sorted(kwargs.items()))))}'
+            value = store.get(key)
+            if value is not MISSING:
+                counts['hits'] += 1
+                return freeze_frame(value)
+            counts['misses'] += 1
+            # Cached frames are shared by every caller, so hand out read-only ones
+            value = freeze_frame(func(*args, **kwargs))
+            store.set(key, value)
+            return value
+
+        wrapper.invalidate = lambda: resolve().invalidate(ns)
+        wrapper.cache_clear = wrapper.invalidate
+        wrapper.cache_info = lambda: dict(counts, namespace=ns, backend=resolve().stats())
+        return wrapper
+    return decorator
@@ -1,4 +1,98 @@
+"""Derived series of the /correlation page.
+
+Each series is built once per version of the files it comes from and kept
+as a frame cache (``cached_frame``) and in memory (``@cached``), so page
+visits never read a CSV:
+
+* :func:`load_correlation_data`: the yearly averages of ``avg_dataset.csv``.
+* :func:`load_world_tree_cover_loss`: world tree-cover loss by year.
+* :func:`load_world_ghg`: world GHG emissions (including LUCF) by year.
+* :func:`load_temperature_sea_level`: global temperature and sea level on
+  their common years, with 5-year centred rolling means.
+
+A missing source file gives an empty frame with the same columns.
+"""
+import logging
+
 import pandas as pd
 
+from components.cache import cached
+from components.frame_cache import cached_frame, source_version
+from components.sea_levels.data import SEA_LEVEL_CSV, load_sea_level_data
+from components.temperature.data import load_avg_dataset
+
+logger = logging.getLogger(__name__)
+
+AVG_CSV = 'dataset/avg_dataset.csv'
+TREE_COVER_CSV = 'dataset/TreeCoverLoss_2001-2020_ByRegion.csv'
+GHG_HISTORICAL_CSV = 'dataset/ALL GHG_historical_emissions.csv'
+SMOOTHING_WINDOW = 5
+
+
+def data_version():
+    """Returns a key that changes whenever any file behind the correlation page changes."""
+    return source_version(AVG_CSV, TREE_COVER_CSV, GHG_HISTORICAL_CSV, SEA_LEVEL_CSV)
+
+
+@cached(version=lambda: source_version(AVG_CSV))
 def load_correlation_data():
-    return pd.read_csv('dataset/avg_dataset.csv')
+    return cached_frame('correlation_avg_dataset', [AVG_CSV], lambda: pd.read_csv(AVG_CSV))
+
+
+@cached(version=lambda: source_version(TREE_COVER_CSV))
+def load_world_tree_cover_loss():
+    """``Year``, ``TreeCoverLoss_ha`` and ``TreeCoverLoss_Mha`` summed over all regions."""
+    def build():
+        tree_world = pd.read_csv(TREE_COVER_CSV).groupby('Year', as_index=False)['TreeCoverLoss_ha'].sum()
+        return tree_world.assign(TreeCoverLoss_Mha=tree_world['TreeCoverLoss_ha'] / 1_000_000)
+
+    try:
+        return cached_frame('correlation_tree_cover_loss', [TREE_COVER_CSV], build)
+    except FileNotFoundError:
+        logger.warning(f"{TREE_COVER_CSV} not found; tree cover loss unavailable")
+        return pd.DataFrame(columns=['Year', 'TreeCoverLoss_ha', 'TreeCoverLoss_Mha'])
+
+
+@cached(version=lambda: source_version(GHG_HISTORICAL_CSV))
+def load_world_ghg():
+    """``Year``, ``Emissions_Mt`` and ``Emissions_Gt`` of the world total including LUCF, all GHG."""
+    def build():
+        ghg_df = pd.read_csv(GHG_HISTORICAL_CSV)
+        world_row = ghg_df[(ghg_df['Country'] == 'World') & (ghg_df['Sector'] == 'Total including LUCF')
+                           & (ghg_df['Gas'] == 'All GHG')]
+        # Melt year columns into rows
+        ghg_melt = world_row.melt(id_vars=['Country', 'Data source', 'Sector', 'Gas', 'Unit'],
+                                  var_name='Year', value_name='Emissions_Mt')
+        ghg_melt = ghg_melt.assign(Year=pd.to_numeric(ghg_melt['Year'], errors='coerce'),
+                                   Emissions_Mt=pd.to_numeric(ghg_melt['Emissions_Mt'], errors='coerce'))
+        ghg_melt = ghg_melt.dropna(subset=['Year']).astype({'Year': 'int64'}).sort_values('Year')
+        return ghg_melt.assign(Emissions_Gt=ghg_melt['Emissions_Mt'] / 1000.0)[['Year', 'Emissions_Mt', 'Emissions_Gt']]
+
+    try:
+        return cached_frame('correlation_world_ghg', [GHG_HISTORICAL_CSV], build)
+    except FileNotFoundError:
+        logger.warning(f"{GHG_HISTORICAL_CSV} not found; world GHG emissions unavailable")
+        return pd.DataFrame(columns=['Year', 'Emissions_Mt', 'Emissions_Gt'])
+
+
+@cached(version=lambda: source_version(AVG_CSV, SEA_LEVEL_CSV))
+def load_temperature_sea_level():
+    """Global temperature (land and ocean when available) and sea level by year, with smoothed copies."""
+    def build():
+        df_temp = load_avg_dataset()
+        # Prepare temperature: use Land & Ocean average if available, else land
+        temp_col = ('Average_LandOcean_Temperature (celsius)' if 'Average_LandOcean_Temperature (celsius)' in df_temp.columns
+                    else 'Average_Land_Temperature (celsius)')
+        temp_df = df_temp[['Year', temp_col]].rename(columns={temp_col: 'Temp_C'})
+        temp_df = temp_df.assign(Year=pd.to_numeric(temp_df['Year'], errors='coerce')).dropna()
+
+        sea_df = load_sea_level_data()[['Year', 'Sea Level']].rename(columns={'Sea Level': 'Sea_Level_mm'})
+        merged = pd.merge(temp_df, sea_df, on='Year', how='inner').sort_values('Year', ignore_index=True)
+
+        # Centred rolling means; the edges keep the original values
+        sea = merged['Sea_Level_mm'].rolling(window=SMOOTHING_WINDOW, center=True).mean()
+        temp = merged['Temp_C'].rolling(window=SMOOTHING_WINDOW, center=True).mean()
+        return merged.assign(Sea_Level_Smooth=sea.fillna(merged['Sea_Level_mm']),
+                             Temp_Smooth=temp.fillna(merged['Temp_C']))
+
+    return cached_frame('correlation_temperature_sea_level', [AVG_CSV, SEA_LEVEL_CSV], build)
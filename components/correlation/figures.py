@@ -0,0 +1,137 @@
+"""The three figures of the /correlation page.
+
+They depend only on the data files, so they are built once per
+:func:`~components.correlation.data.data_version` from the cached series in
+:mod:`.data`, stored on disk with
+:func:`components.figure_cache.stored_figure` and kept in memory by
+:func:`get_correlation_figures`. Navigating to the page only serializes the
+stored dicts.
+"""
+import plotly.graph_objects as go
+
+from components.cache import cached
+from components.figure_cache import stored_figure
+from .data import data_version, load_correlation_data, load_temperature_sea_level, load_world_ghg, load_world_tree_cover_loss
+
+# Bump when a builder changes so figures stored for the same data are rebuilt
+FIGURES_VERSION = 1
+TREE_GHG_YEARS = (2001, 2020)
+
+
+def build_temp_sea_figure():
+    merged_ts = load_temperature_sea_level()
+
+    fig_temp_sea = go.Figure()
+    fig_temp_sea.add_trace(go.Scatter(
+        x=merged_ts['Year'], y=merged_ts['Sea_Level_Smooth'], name='Sea Level (mm)',
+        mode='lines', line=dict(color='royalblue', width=2), yaxis='y'
+    ))
+    fig_temp_sea.add_trace(go.Scatter(
+        x=merged_ts['Year'], y=merged_ts['Temp_Smooth'], name='Global Avg Temperature (°C)',
+        mode='lines', line=dict(color='firebrick', width=2), yaxis='y2'
+    ))
+    fig_temp_sea.update_layout(
+        title='Global Temperature vs Sea Level Over Time',
+        xaxis=dict(title='Year', tickmode='linear', dtick=10),
+        yaxis=dict(
+            title=dict(
+                text='Sea Level (mm relative to 1993-2008 avg)',
+                font=dict(color='royalblue')
+            ),
+            tickfont=dict(color='royalblue')
+        ),
+        yaxis2=dict(
+            title=dict(
+                text='Temperature (°C)',
+                font=dict(color='firebrick')
+            ),
+            overlaying='y',
+            side='right',
+            tickfont=dict(color='firebrick')
+        ),
+        legend=dict(orientation='h', yanchor='bottom', y=-0.25),
+        plot_bgcolor='white',
+        font_family='Arial'
+    )
+    return fig_temp_sea
+
+
+def build_corr_merged_figure():
+    data_temp = load_correlation_data()
+    years = data_temp['Year']
+    temp = data_temp['Average_Land_Temperature (celsius)']
+    temp1 = data_temp['Average_LandOcean_Temperature (celsius)']
+    emissions = data_temp['Average_Emissions (MtCO₂e)']
+    sea = data_temp['Average_Sealevel (mm)']
+
+    fig_corr_merged = go.Figure()
+    fig_corr_merged.add_trace(go.Scatter(x=years, y=temp, mode='lines+markers', name='Land Temperature', line=dict(color='red', width=2), marker=dict(color='red', size=8)))
+    fig_corr_merged.add_trace(go.Scatter(x=years, y=temp1, mode='lines+markers', name='Land and Ocean Temperature', line=dict(color='orange', width=2), marker=dict(color='orange', size=8)))
+    fig_corr_merged.add_trace(go.Scatter(x=years, y=emissions, mode='lines+markers', name='Carbon Emissions', line=dict(color='blue', width=2), marker=dict(color='blue', size=8), yaxis='y2'))
+    fig_corr_merged.add_trace(go.Scatter(x=years, y=sea, mode='lines+markers', name='Sea level', line=dict(color='green', width=2), marker=dict(color='green', size=8), yaxis='y3'))
+
+    fig_corr_merged.update_layout(
+        font=dict(family='Arial', size=12, color='black'),
+        title=dict(text='Correlation between Temperatures, Carbon Emissions and Sea level (1990-2020)', xanchor='center', yanchor='top', x=0.5, y=0.95),
+        xaxis=dict(title='Year', tickmode='linear', tick0=1990, dtick=5),
+        yaxis=dict(title='Temperature (°C above pre-industrial levels)', range=[8, 18], color='red', title_font=dict(size=16)),
+        yaxis2=dict(title='Carbon Emissions (metric tons per capita)', range=[22500, 37000], overlaying='y', side='right', color='blue', title_font=dict(size=16)),
+        yaxis3=dict(title='Sea level(mm)', range=[-25, 69], overlaying='y', side='right', position=.94, color='green', title_font=dict(size=16)),
+        legend=dict(orientation='h', yanchor='bottom', y=-0.2),
+    )
+    return fig_corr_merged
+
+
+def build_tree_ghg_figure():
+    tree_world = load_world_tree_cover_loss()
+    ghg_world = load_world_ghg()
+    ghg_world = ghg_world[ghg_world['Year'].between(*TREE_GHG_YEARS)]
+
+    # Keep the years present in both series
+    common_years = sorted(set(tree_world['Year']).intersection(set(ghg_world['Year'])))
+    tree_filtered = tree_world[tree_world['Year'].isin(common_years)]
+    ghg_filtered = ghg_world[ghg_world['Year'].isin(common_years)]
+
+    fig_defor_em = go.Figure()
+    fig_defor_em.add_trace(go.Bar(
+        x=tree_filtered['Year'],
+        y=tree_filtered['TreeCoverLoss_Mha'],
+        name='Tree Cover Loss (Million ha)',
+        marker_color='forestgreen',
+        opacity=0.7,
+        yaxis='y'
+    ))
+    fig_defor_em.add_trace(go.Scatter(
+        x=ghg_filtered['Year'],
+        y=ghg_filtered['Emissions_Gt'],
+        name='Global GHG Emissions (Gt CO₂e)',
+        mode='lines+markers',
+        line=dict(color='crimson', width=3),
+        marker=dict(color='crimson', size=8),
+        yaxis='y2'
+    ))
+    fig_defor_em.update_layout(
+        title='Global Tree Cover Loss vs GHG Emissions (2001-2020)',
+        font_family='Arial',
+        xaxis=dict(title='Year', tickmode='linear'),
+        yaxis=dict(title=dict(text='Tree Cover Loss (Million ha)', font=dict(color='forestgreen')), tickfont=dict(color='forestgreen')),
+        yaxis2=dict(title=dict(text='GHG Emissions (Gt CO₂e)', font=dict(color='crimson')), overlaying='y', side='right', tickfont=dict(color='crimson')),
+        legend=dict(orientation='h', yanchor='bottom', y=-0.25),
+        barmode='group',
+        plot_bgcolor='white'
+    )
+    return fig_defor_em
+
+
+BUILDERS = {
+    'correlation_temp_sea': build_temp_sea_figure,
+    'correlation_merged': build_corr_merged_figure,
+    'correlation_tree_ghg': build_tree_ghg_figure,
+}
+
+
+@cached(version=data_version)
+def get_correlation_figures():
+    """Return the correlation figures as dicts keyed by name, built once per data version."""
+    version = f'{data_version()}.{FIGURES_VERSION}'
+    return {name: stored_figure(name, version, build) for name, build in BUILDERS.items()}
@@ -0,0 +1,117 @@
+"""Region x year forest-area aggregates with constant-time range queries.
+
+:class:`ForestAnalytics` holds the forest area of every country for every
+snapshot year of ``Forest_Area.csv`` as one matrix. Gaps between two known
+snapshots are interpolated linearly; values before a country's first or
+after its last snapshot stay missing. From that matrix one pass of
+``bincount`` over (region, year) cells gives the sum, mean and standard
+deviation of the forest area of every region and year.
+
+For the change over a year range, the change between consecutive snapshots
+is summed per region over the countries known at both ends, and stored as a
+prefix sum. The change of a region between any two snapshot years is then
+the difference of two prefix entries, so the year-range slider on the
+deforestation page never rescans the countries.
+"""
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from .data import data_version, load_deforestation_data
+
+WORLD = 'World'
+
+
+class ForestAnalytics:
+    """Forest area per country and year, aggregated per region."""
+
+    def __init__(self, df: pd.DataFrame):
+        forests = sorted(c for c in df.columns if c.startswith('forests_'))
+        self.years = np.array([int(c[len('forests_'):]) for c in forests], dtype=np.int64)
+        self.countries = df['Country and Area'].to_numpy()
+        region_codes, regions = pd.factorize(df['Region'], sort=True)
+        self.regions: List[str] = list(regions)
+        self.country_regions = df['Region'].to_numpy()
+
+        values = df[forests].set_axis(self.years, axis=1)
+        self.values = values.interpolate(method='index', axis=1, limit_area='inside').to_numpy(dtype=float)
+
+        n_regions, n_years = len(self.regions), len(self.years)
+        known = ~np.isnan(self.values)
+        filled = np.where(known, self.values, 0.0)
+        cells = (region_codes[:, None] * n_years + np.arange(n_years)).ravel()
+        size = n_regions * n_years
+
+        def per_cell(weights):
+            return np.bincount(cells, weights=weights.ravel(), minlength=size).reshape(n_regions, n_years)
+
+        self.count = per_cell(known.astype(float))
+        self.sum = per_cell(filled)
+        squares = per_cell(filled ** 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = self.sum / self.count
+            # Sample standard deviation, as pandas computes it
+            self.std = np.sqrt(np.maximum(squares - self.count * self.mean ** 2, 0) / (self.count - 1))
+
+        # Change between consecutive snapshots, summed over the countries known at both
+        step = np.nan_to_num(np.diff(self.values, axis=1))
+        steps = np.zeros((n_regions, n_years - 1))
+        if n_years > 1:
+            step_cells = (region_codes[:, None] * (n_years - 1) + np.arange(n_years - 1)).ravel()
+            steps = np.bincount(step_cells, weights=step.ravel(),
+                                minlength=n_regions * (n_years - 1)).reshape(n_regions, n_years - 1)
+        steps = np.vstack([steps, steps.sum(axis=0)])
+        # _cumulative[r, k]: change of region r (the last row is the world) from the first year to years[k]
+        self._cumulative = np.hstack([np.zeros((n_regions + 1, 1)), np.cumsum(steps, axis=1)])
+        self._region_row = {region: row for row, region in enumerate(self.regions + [WORLD])}
+
+    def _year_index(self, year):
+        position = int(np.searchsorted(self.years, year))
+        if position == len(self.years) or self.years[position] != year:
+            raise ValueError(f"{year} is not a snapshot year; expected one of {self.years.tolist()}")
+        return position
+
+    def change(self, region, start, end):
+        """Change of the forest area of ``region`` (or ``'World'``) from ``start`` to ``end``."""
+        row = self._region_row[region]
+        return float(self._cumulative[row, self._year_index(end)] - self._cumulative[row, self._year_index(start)])
+
+    def region_changes(self, start, end):
+        """``Region``/``Change`` frame of every region from ``start`` to ``end``, largest loss first."""
+        i, j = self._year_index(start), self._year_index(end)
+        change = self._cumulative[:len(self.regions), j] - self._cumulative[:len(self.regions), i]
+        return pd.DataFrame({'Region': self.regions, 'Change': change}).sort_values('Change', ignore_index=True)
+
+    def region_year_stats(self):
+        """Long ``Region``/``Year``/``Forest_Sum``/``Forest_Mean``/``Forest_Std``/``Countries`` frame."""
+        n_regions, n_years = self.sum.shape
+        return pd.DataFrame({
+            'Region': np.repeat(self.regions, n_years),
+            'Year': np.tile(self.years, n_regions),
+            'Forest_Sum': self.sum.ravel(),
+            'Forest_Mean': self.mean.ravel(),
+            'Forest_Std': self.std.ravel(),
+            'Countries': self.count.ravel().astype(np.int64),
+        })
+
+    def country_changes(self, start, end):
+        """Forest area of every country at ``start`` and ``end`` with the share remaining."""
+        i, j = self._year_index(start), self._year_index(end)
+        before, after = self.values[:, i], self.values[:, j]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            remain = np.where(before > 0, after / before * 100.0, np.nan)
+        return pd.DataFrame({'Country and Area': self.countries, 'Region': self.country_regions,
+                             'Forest_Start': before, 'Forest_End': after, 'Change': after - before,
+                             'Percent_Remain': remain})
+
+
+@lru_cache(maxsize=1)
+def _analytics(version):
+    return ForestAnalytics(load_deforestation_data()[0])
+
+
+def get_forest_analytics():
+    """Return the :class:`ForestAnalytics` of the current forest-area data (rebuilt when the files change)."""
+    return _analytics(data_version())
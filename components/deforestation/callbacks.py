@@ -0,0 +1,17 @@
+from dash import callback, Input, Output, no_update
+
+from .figures import build_range_figures
+
+@callback(
+    Output('deforestation-choropleth', 'figure'),
+    Output('deforestation-bar-plot', 'figure'),
+    Output('deforestation-region-trend', 'figure'),
+    Input('deforestation-year-range', 'value'),
+    prevent_initial_call=True
+)
+def update_year_range(year_range):
+    """Serve the cached range figures for the selected pair of snapshot years."""
+    if not year_range or year_range[0] == year_range[1]:
+        return no_update, no_update, no_update
+    figures = build_range_figures(int(year_range[0]), int(year_range[1]))
+    return figures['map'], figures['bar'], figures['trend']
@@ -1,5 +1,14 @@
 import pandas as pd
 
+from components.cache import cached
+from components.frame_cache import cached_frame, source_version
+from components.reshape import year_columns, wide_to_long
+
+FOREST_AREA_CSV = 'dataset/Forest_Area.csv'
+CONTINENTS_CSV = 'dataset/continents2.csv.xls'
+# "Forest Area, 1990" ... "Forest Area, 2020"
+FOREST_AREA_COLUMN = r'^(?P<measure>Forest Area), (?P<year>\d{4})$'
+
 # ---------------------------------------------------------------------------
 # Helper utilities
 # ---------------------------------------------------------------------------
@@ -14,25 +23,19 @@ def _clean_numeric(series):
                              errors='coerce')
 
 
-# A *very* small manual region map (keep only what we show in the dashboard).
-# Feel free to extend if you want more countries displayed.
-REGION_MAP = {
-    # South America
-    'Brazil': 'South America', 'Colombia': 'South America', 'Peru': 'South America',
-    'Venezuela (Bolivarian Republic of)': 'South America',
-    # North America
-    'United States of America': 'North America', 'Canada': 'North America', 'Mexico': 'North America',
-    # Asia
-    'China': 'Asia', 'India': 'Asia', 'Indonesia': 'Asia', 'Malaysia': 'Asia', 'Japan': 'Asia',
-    # Europe
-    'Russian Federation': 'Europe', 'Germany': 'Europe', 'France': 'Europe',
-    'United Kingdom of Great Britain and Northern Ireland': 'Europe',
-    # Oceania
-    'Australia': 'Oceania', 'New Zealand': 'Oceania',
-    # Africa
-    'Nigeria': 'Africa', 'Democratic Republic of the Congo': 'Africa',
-    'South Africa': 'Africa', 'Kenya': 'Africa'
-}
+def _continent_map():
+    """Continent of every country, keyed by its numeric UN M49 code (``CountryID`` in Forest_Area.csv).
+
+    The Americas are split into North America (with Central America and the
+    Caribbean) and South America.
+    """
+    def build():
+        continents = pd.read_csv(CONTINENTS_CSV)
+        region = continents['region'].where(continents['region'] != 'Americas',
+                                            continents['intermediate-region'].map({'South America': 'South America'})
+                                            .fillna('North America'))
+        return pd.DataFrame({'CountryID': continents['country-code'], 'Region': region}).dropna()
+    return cached_frame('forest_continents', [CONTINENTS_CSV], build)
 
 
 # ---------------------------------------------------------------------------
@@ -40,92 +43,54 @@ REGION_MAP = {
 # ---------------------------------------------------------------------------
 
 
+def data_version():
+    """Returns a key that changes whenever the forest-area or continent file changes."""
+    return source_version(FOREST_AREA_CSV, CONTINENTS_CSV)
+
+
+@cached(version=data_version)
 def load_deforestation_data():
     """Load and preprocess forest-area data for deforestation analysis.
 
-    The new dataset `Forest_Area.csv` contains forest-area snapshots for
-    1990-2020.  We only use the 2000 and 2020 columns to keep the
-    existing figures untouched while providing more reliable numbers.
+    `Forest_Area.csv` has forest-area snapshots for 1990, 2000, 2010, 2015
+    and 2020. Every country is kept with its continent, and every year as a
+    ``forests_<year>`` column and in the time series; ``Forest_Loss``
+    compares 2000 with 2020.
     """
+    sources = [FOREST_AREA_CSV, CONTINENTS_CSV]
+    df = cached_frame('forest_area', sources, _read_forest_area, version=3)
+    time_series_df = cached_frame('forest_area_time_series', sources, lambda: _build_time_series(df), version=3)
+    return df, time_series_df
+
 
-    raw = pd.read_csv('dataset/Forest_Area.csv')
+def _read_forest_area():
+    raw = pd.read_csv(FOREST_AREA_CSV)
 
     # Drop the aggregated WORLD row and any empty country rows
     raw = raw[raw['Country and Area'].notna() & (raw['Country and Area'] != 'WORLD')]
 
-    # Keep only the columns we need
-    cols_of_interest = [
-        'Country and Area',
-        'Forest Area, 2000',
-        'Forest Area, 2020'
-    ]
-    df = raw[cols_of_interest].copy()
+    # Clean every "Forest Area, <year>" column (some cells contain unicode ellipsis)
+    forest_columns = year_columns(raw.columns, FOREST_AREA_COLUMN)
+    df = raw[['CountryID', 'Country and Area'] + [column for column, _, _ in forest_columns]].copy()
+    forests = []
+    for column, _, year in forest_columns:
+        df[f'forests_{year}'] = _clean_numeric(df[column])
+        forests.append(f'forests_{year}')
 
-    # Clean numeric columns (some cells contain unicode ellipsis)
-    df['forests_2000'] = _clean_numeric(df['Forest Area, 2000'])
-    df['forests_2020'] = _clean_numeric(df['Forest Area, 2020'])
-
-    # Drop rows with missing numbers
-    df = df.dropna(subset=['forests_2000', 'forests_2020'])
+    # Drop countries without any forest figure
+    df = df.dropna(subset=forests, how='all')
 
     # Calculate absolute forest-area change (negative = loss)
     df['Forest_Loss'] = df['forests_2020'] - df['forests_2000']
 
-    # Minimal region mapping – rows w/o a region are discarded (keeps visuals tidy)
-    df['Region'] = df['Country and Area'].map(REGION_MAP)
-    df = df[df['Region'].notna()]
-
-    # ------------------------------------------------------------------
-    # Build a time-series dataframe for the line plot
-    # We include 2000 and 2020 only to preserve the visual structure; if
-    # you want richer detail, extend `years`.
-    # ------------------------------------------------------------------
-
-    time_series_rows = []
-    years = [2000, 2020]
-    for _, row in df.iterrows():
-        for yr in years:
-            col = f'forests_{yr}' if yr != 2000 else 'forests_2000'
-            # 2000 already loaded; for 2020 we have forests_2020
-            val = row['forests_2020'] if yr == 2020 else row['forests_2000']
-            time_series_rows.append({
-                'Year': yr,
-                'Forest_Cover': val,
-                'Country': row['Country and Area'],
-                'Region': row['Region']
-            })
-
-    time_series_df = pd.DataFrame(time_series_rows)
+    # Continent of every country from its UN code
+    df = df.merge(_continent_map(), on='CountryID', how='left')
+    return df[df['Region'].notna()].reset_index(drop=True)
 
-    return df, time_series_df
 
-def calculate_regional_stats(df):
-    """Calculate regional deforestation statistics."""
-    # Group by region and calculate statistics
-    regional_stats = df.groupby('Region').agg({
-        'Forest_Loss': ['sum', 'mean', 'std'],
-        'forests_2020': 'mean'  # Current forest cover
-    }).round(2)
-    
-    # Flatten column names
-    regional_stats.columns = ['Total_Loss', 'Average_Loss', 'Loss_Std', 'Current_Forest_Cover']
-    regional_stats = regional_stats.reset_index()
-    
-    # Sort by Total_Loss
-    regional_stats = regional_stats.sort_values('Total_Loss', ascending=True)
-    
-    return regional_stats
-
-def get_top_countries(df, n=10):
-    """Get top N countries with most forest loss/gain."""
-    df_sorted = df.sort_values('Forest_Loss')
-    
-    # Get top N losses and gains
-    top_losses = df_sorted.head(n)
-    top_gains = df_sorted.tail(n)
-    
-    # Combine and sort by Forest_Loss
-    top_changes = pd.concat([top_losses, top_gains])
-    top_changes = top_changes.sort_values('Forest_Loss')
-    
-    return top_changes 
\ No newline at end of file
+def _build_time_series(df):
+    """One row per country and snapshot year (years without a value are left out)."""
+    time_series = wide_to_long(df, ['Country and Area', 'Region'], r'^(?P<measure>forests)_(?P<year>\d{4})$',
+                               measures={'forests': 'Forest_Cover'})
+    time_series = time_series.rename(columns={'Country and Area': 'Country'})
+    return time_series.dropna(subset=['Forest_Cover'])[['Year', 'Forest_Cover', 'Country', 'Region']].reset_index(drop=True)
@@ -0,0 +1,113 @@
+"""Deforestation figures that depend on the selected year range.
+
+The map, the regional change bars and the regional forest-area chart are
+built from :class:`~components.deforestation.analytics.ForestAnalytics`,
+so a new range only reads its precomputed arrays. Each figure set is cached
+per data version and range (:func:`build_range_figures`); the year-range
+slider callback just returns the cached dicts.
+"""
+import plotly.express as px
+import plotly.graph_objects as go
+
+from components.cache import cached
+from .analytics import get_forest_analytics
+from .data import data_version
+
+DEFAULT_RANGE = (2000, 2020)
+
+
+def _region_colors(regions):
+    palette = px.colors.qualitative.Plotly
+    return {region: palette[i % len(palette)] for i, region in enumerate(regions)}
+
+
+def build_map_figure(start, end):
+    df = get_forest_analytics().country_changes(start, end).dropna(subset=['Percent_Remain'])
+    fig_map = px.choropleth(
+        df,
+        locations='Country and Area',
+        locationmode='country names',
+        color='Percent_Remain',
+        hover_name='Country and Area',
+        hover_data={'Percent_Remain': ':.2f', 'Forest_End': ':,', 'Forest_Start': ':,', 'Region': True},
+        color_continuous_scale='Greens',
+        range_color=(df['Percent_Remain'].min(), df['Percent_Remain'].max()),
+        labels={'Percent_Remain': '% Forests Left', 'Forest_Start': f'Forest area {start}',
+                'Forest_End': f'Forest area {end}'},
+        title=f'% Forest Cover Remaining ({end} vs {start})'
+    )
+    fig_map.update_layout(
+        geo=dict(showframe=False, showcoastlines=False, projection_type='natural earth'),
+        margin=dict(l=0, r=0, t=50, b=0),
+        coloraxis_colorbar=dict(title='% Remaining')
+    )
+    return fig_map
+
+
+def build_bar_figure(start, end):
+    analytics = get_forest_analytics()
+    changes = analytics.region_changes(start, end)
+    colors = _region_colors(analytics.regions)
+
+    fig_bar = go.Figure()
+    fig_bar.add_vline(x=0, line_width=2, line_dash="dash", line_color="grey")
+    fig_bar.add_trace(go.Bar(
+        y=changes['Region'],
+        x=changes['Change'],
+        orientation='h',
+        marker_color=[colors[r] for r in changes['Region']],
+        text=[f'{x:,.2f} km²' for x in changes['Change']],
+        textposition='auto'
+    ))
+    if 'South America' in analytics.regions:
+        fig_bar.add_annotation(
+            x=analytics.change('South America', start, end),
+            y='South America',
+            text="Amazon deforestation",
+            showarrow=True, arrowhead=1, ax=-40, ay=-40
+        )
+    fig_bar.update_layout(
+        title=f'Total Forest Cover Change by Region ({start}–{end}, world: '
+              f'{analytics.change("World", start, end):,.0f} km²)',
+        xaxis_title='Total Forest Loss (km²)',
+        yaxis_title='Region',
+        paper_bgcolor='white',
+        plot_bgcolor='#f8f9fa'
+    )
+    return fig_bar
+
+
+def build_trend_figure(start, end):
+    analytics = get_forest_analytics()
+    stats = analytics.region_year_stats()
+    colors = _region_colors(analytics.regions)
+
+    fig_trend = go.Figure()
+    for region, group in stats.groupby('Region', sort=False):
+        fig_trend.add_trace(go.Scatter(
+            x=group['Year'], y=group['Forest_Sum'], mode='lines+markers', name=region,
+            line=dict(color=colors[region], width=3),
+            customdata=group[['Forest_Mean', 'Forest_Std', 'Countries']].to_numpy(),
+            hovertemplate=('%{x}: %{y:,.0f} km²<br>per country: %{customdata[0]:,.0f} ± %{customdata[1]:,.0f}'
+                           '<br>%{customdata[2]} countries<extra>' + region + '</extra>')
+        ))
+    fig_trend.add_vrect(x0=start, x1=end, fillcolor='green', opacity=0.08, line_width=0)
+    fig_trend.update_layout(
+        title='Forest Area by Region',
+        xaxis_title='Year',
+        yaxis_title='Forest area (km²)',
+        paper_bgcolor='white',
+        plot_bgcolor='#f8f9fa',
+        hovermode='x unified'
+    )
+    return fig_trend
+
+
+@cached(version=data_version)
+def build_range_figures(start, end):
+    """The map, bar and trend figures for the years ``start``-``end``, as figure dicts."""
+    return {
+        'map': build_map_figure(start, end).to_dict(),
+        'bar': build_bar_figure(start, end).to_dict(),
+        'trend': build_trend_figure(start, end).to_dict(),
+    }
@@ -0,0 +1,136 @@
+"""Server-side downsampling of long time series before they are plotted.
+
+A line with tens of thousands of daily points draws no better than one with
+a point or two per horizontal pixel, but every point is serialized into the
+figure JSON. :func:`downsample_frame` picks at most ``MAX_POINTS`` rows of
+a frame, chosen on one column with a shape-preserving method:
+
+``lttb``
+    Largest-Triangle-Three-Buckets. Keeps the point of each bucket that
+    forms the largest triangle with the previously kept point and the mean
+    of the next bucket, which preserves peaks and the visual shape.
+``minmax``
+    Keeps the lowest and the highest point of every bucket, so the envelope
+    of noisy data is exact.
+
+The same rows are taken for every column, so bands and lines drawn from one
+frame stay aligned. When the user zooms, the page's ``relayoutData``
+callback passes the visible range (see :func:`relayout_x_range`) and the
+slice in view is downsampled again at full budget, so detail comes back as
+the window narrows.
+
+``CLIMATE_MAX_POINTS`` (default 2000) sets the budget per trace.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+MAX_POINTS = int(os.environ.get('CLIMATE_MAX_POINTS', 2000))
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[ns]').view(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the ``n_out`` points Largest-Triangle-Three-Buckets keeps (first and last included)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = _as_float(y)
+    y_filled = np.where(np.isnan(y), 0.0, y)
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1])[:len(counts)] / counts
+    mean_y = np.add.reduceat(y_filled[:-1], edges[:-1])[:len(counts)] / counts
+    # The bucket after the last one is the final point itself
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y_filled[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y_filled[lo:hi] - y_filled[a])
+                      - (x[a] - x[lo:hi]) * (next_y[i] - y_filled[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(x, y, n_out):
+    """Indices of the minimum and maximum of ``y`` per bucket, at most ``n_out`` (first and last included)."""
+    n = len(y)
+    buckets = (n_out - 2) // 2
+    if n <= n_out or buckets < 1:
+        return np.arange(n)
+    y = _as_float(y)
+    size = -(-n // buckets)
+    pad = size * buckets - n
+    low = np.concatenate([np.where(np.isnan(y), np.inf, y), np.full(pad, np.inf)]).reshape(buckets, size)
+    high = np.concatenate([np.where(np.isnan(y), -np.inf, y), np.full(pad, -np.inf)]).reshape(buckets, size)
+    base = np.arange(buckets) * size
+    kept = np.concatenate(([0, n - 1], base + low.argmin(axis=1), base + high.argmax(axis=1)))
+    return np.unique(kept[kept < n])
+
+
+METHODS = {'lttb': lttb_indices, 'minmax': minmax_indices}
+
+
+def downsample_indices(x, y, n_out=MAX_POINTS, method='lttb'):
+    """Positions of the points of (``x``, ``y``) to plot, in ascending order."""
+    try:
+        select = METHODS[method]
+    except KeyError:
+        raise ValueError(f"Unknown downsampling method {method!r}; expected one of {sorted(METHODS)}")
+    return select(x, y, n_out)
+
+
+def downsample_frame(df, x, y, n_out=MAX_POINTS, method='lttb', x_range=None):
+    """Rows of ``df`` to plot, chosen on column ``y`` in row order.
+
+    ``x_range`` is an optional ``(start, end)`` pair limiting the rows to the
+    visible window first; either end may be None.
+    """
+    if x_range is not None and x_range != (None, None):
+        start, end = x_range
+        values = df[x]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            start = None if start is None else pd.Timestamp(start)
+            end = None if end is None else pd.Timestamp(end)
+        visible = np.ones(len(df), dtype=bool)
+        if start is not None:
+            visible &= (values >= start).to_numpy()
+        if end is not None:
+            visible &= (values <= end).to_numpy()
+        df = df[visible]
+    if len(df) <= n_out:
+        return df
+    return df.iloc[downsample_indices(df[x].to_numpy(), df[y].to_numpy(), n_out, method)]
+
+
+def relayout_x_range(relayout, axis='xaxis'):
+    """Visible x range from a graph's ``relayoutData``.
+
+    Returns ``(start, end)`` after a zoom or pan, ``(None, None)`` when the
+    axis was reset to its full range, and None when the event did not change
+    the x axis (hover mode, legend clicks, y-only zoom).
+    """
+    if not relayout:
+        return None
+    if relayout.get(f'{axis}.autorange'):
+        return (None, None)
+    if f'{axis}.range[0]' in relayout and f'{axis}.range[1]' in relayout:
+        return (relayout[f'{axis}.range[0]'], relayout[f'{axis}.range[1]'])
+    if f'{axis}.range' in relayout:
+        start, end = relayout[f'{axis}.range']
+        return (start, end)
+    return None
@@ -0,0 +1,163 @@
+"""Pre-serialized figure cache served over HTTP with ETags.
+
+Figures that are identical for every visitor (e.g. the country choropleths on
+the temperature page) are registered here with a builder instead of being
+returned from a server-side callback, where Dash would re-encode the whole
+figure, geojson included, on every dropdown change. The first request builds
+the figure and serializes it once (plotly picks orjson when it is installed);
+later requests get the stored bytes, and browsers revalidating with
+``If-None-Match`` get a 304 with no body.
+
+The page fetches figures from ``<prefix>_figures/<namespace>/<key>`` in a
+clientside callback, see ``components/temperature/callbacks.py``.
+
+Figures that are expensive to build but depend on data that changes (e.g. the
+GHG racing bars) go through :func:`stored_figure` instead, which keeps the
+serialized figure on disk under ``.cache/figures/`` keyed by a data version so
+every worker and restart reuses it.
+"""
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import plotly.io as pio
+from flask import Response, abort, request
+
+from components.frame_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+FIGURE_DIR = os.path.join(CACHE_DIR, 'figures')
+
+
+class CachedFigure:
+    """Serialized figure bytes plus their gzip copy and ETag."""
+
+    def __init__(self, body):
+        self.body = body
+        self.gzip = gzip.compress(body, compresslevel=6)
+        self.etag = hashlib.sha1(body).hexdigest()
+
+
+class FigureCache:
+    def __init__(self):
+        self._builders = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, namespace, key, builder):
+        """Register ``builder()`` as the source of figure ``namespace/key``."""
+        self._builders[(namespace, key)] = builder
+
+    def get(self, namespace, key):
+        """Return the :class:`CachedFigure` for ``namespace/key``, building it on first use."""
+        entry = self._entries.get((namespace, key))
+        if entry is not None:
+            return entry
+        builder = self._builders.get((namespace, key))
+        if builder is None:
+            return None
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                start = time.perf_counter()
+                entry = CachedFigure(serialize_figure(builder()))
+                self._entries[(namespace, key)] = entry
+                logger.info(f"Serialized figure {namespace}/{key} ({len(entry.body) / 1e6:.2f} MB) in {time.perf_counter() - start:.2f}s")
+        return entry
+
+    def warm_up(self, namespace=None):
+        """Build and serialize every registered figure (optionally one namespace only).
+
+        A figure that fails to build is logged and skipped, so one missing file
+        does not stop the others (or the server) from starting.
+        """
+        for ns, key in list(self._builders):
+            if namespace is None or ns == namespace:
+                try:
+                    self.get(ns, key)
+                except Exception as e:
+                    logger.error(f"Error warming up figure {ns}/{key}: {e}", exc_info=True)
+
+    def invalidate(self, namespace=None):
+        with self._lock:
+            for ns, key in list(self._entries):
+                if namespace is None or ns == namespace:
+                    del self._entries[(ns, key)]
+
+    def init_app(self, app):
+        """Add the ``_figures`` route to a Dash app's Flask server."""
+        route = f'{app.config.routes_pathname_prefix}_figures/<namespace>/<key>'
+
+        @app.server.route(route)
+        def serve_figure(namespace, key):
+            entry = self.get(namespace, key)
+            if entry is None:
+                abort(404)
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = Response(entry.gzip, mimetype='application/json')
+                response.headers['Content-Encoding'] = 'gzip'
+                response.set_etag(entry.etag + '-gz')
+            else:
+                response = Response(entry.body, mimetype='application/json')
+                response.set_etag(entry.etag)
+            response.headers['Vary'] = 'Accept-Encoding'
+            # Let the browser keep the body but revalidate each time (cheap 304)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+
+    @staticmethod
+    def url(app, namespace):
+        """Return the URL prefix the browser should fetch ``namespace`` figures from."""
+        return f'{app.config.requests_pathname_prefix}_figures/{namespace}/'
+
+
+def serialize_figure(fig):
+    """Serialize a figure (``go.Figure`` or dict) to JSON bytes."""
+    return pio.to_json(fig, validate=False).encode('utf-8')
+
+
+def stored_figure(name, version, build):
+    """Return figure ``name`` as a dict, reusing the copy stored on disk for ``version``.
+
+    ``build()`` runs only when no copy for this ``version`` exists; older
+    versions of the same figure are removed when the new one is written.
+    """
+    path = os.path.join(FIGURE_DIR, f'{name}-{version}.json')
+    try:
+        with open(path, 'rb') as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable stored figure {path}: {e}")
+
+    start = time.perf_counter()
+    body = serialize_figure(build())
+    try:
+        os.makedirs(FIGURE_DIR, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not store figure {name}: {e}")
+    else:
+        # Same name, other version (versions never contain '-', longer names do)
+        prefix = os.path.join(FIGURE_DIR, f'{name}-')
+        for stale in glob.glob(glob.escape(prefix) + '*.json'):
+            if stale != path and '-' not in stale[len(prefix):-len('.json')]:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+    logger.info(f"Stored figure {name} ({len(body) / 1e6:.2f} MB) in {time.perf_counter() - start:.2f}s")
+    return json.loads(body)
+
+
+figure_cache = FigureCache()
@@ -0,0 +1,94 @@
+"""On-disk columnar cache for the cleaned DataFrames built from ``dataset/``.
+
+Loaders wrap their read-and-clean step with :func:`cached_frame`. The cleaned
+frame (parsed dates, renamed columns, coerced numerics) is written once as a
+Feather (Arrow IPC) file whose name includes the size and mtime of every
+source file, and later process starts read it back memory-mapped instead of
+parsing the CSV again. Files are written uncompressed so that the read maps
+the file's pages rather than decompressing every column into private
+memory. When a source file changes the key changes too, so the stale copy
+is never read and the loader falls back to the CSV.
+
+The cache is skipped when pyarrow is not installed or ``CLIMATE_FRAME_CACHE=0``.
+Either way the frame is returned read-only (see ``components/shared.py``).
+"""
+import glob
+import hashlib
+import logging
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; loaders just read the CSV every time
+    pa = None
+    feather = None
+
+from components.shared import freeze_frame
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get('CLIMATE_CACHE_DIR', '.cache')
+FRAME_DIR = os.path.join(CACHE_DIR, 'frames')
+# Bump when the file layout changes (2: uncompressed) so older copies are rewritten
+FRAME_FORMAT = 2
+
+
+def source_version(*paths):
+    """Return a short digest of the size and mtime of ``paths`` (missing files included)."""
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            st = os.stat(path)
+            digest.update(f'{path}:{st.st_size}:{st.st_mtime_ns};'.encode())
+        except FileNotFoundError:
+            digest.update(f'{path}:missing;'.encode())
+    return digest.hexdigest()[:16]
+
+
+def cache_enabled():
+    return feather is not None and os.environ.get('CLIMATE_FRAME_CACHE', '1') != '0'
+
+
+def cached_frame(name, sources, build, version=1):
+    """Return the DataFrame produced by ``build()``, reusing an on-disk copy.
+
+    ``name`` identifies the loader, ``sources`` lists the files the frame is
+    derived from and ``version`` must be bumped whenever the cleaning steps in
+    ``build`` change.
+    """
+    if not cache_enabled():
+        return freeze_frame(build())
+
+    path = os.path.join(FRAME_DIR, f'{name}-v{version}-f{FRAME_FORMAT}-{source_version(*sources)}.feather')
+    if os.path.exists(path):
+        try:
+            return freeze_frame(feather.read_table(path, memory_map=True).to_pandas())
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable frame cache {path}: {e}")
+
+    df = build()
+    _write(name, path, df)
+    return freeze_frame(df)
+
+
+def _write(name, path, df):
+    """Persist ``df`` to ``path`` and remove older copies of the same frame."""
+    try:
+        os.makedirs(FRAME_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(df)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        # Uncompressed, so the memory-mapped read shares the file's pages instead of decompressing
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    except Exception as e:
+        # Unsupported column types or a read-only checkout: keep serving from the CSV
+        logger.warning(f"Could not cache frame {name}: {e}")
+        return
+
+    for stale in glob.glob(os.path.join(FRAME_DIR, f'{name}-v*.feather')):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
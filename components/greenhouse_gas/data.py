@@ -1,8 +1,14 @@
+import numpy as np
 import pandas as pd
 from functools import lru_cache
 import pycountry_convert as pc
 import re
 
+from components.cache import cached
+from components.frame_cache import cached_frame, source_version
+from .pipeline import Source, load_merged
+from .query import EmissionsQuery
+
 # Mapping for country names that differ between datasets or are aggregations
 COUNTRY_NAME_MAP = {
     'European Union (27)': None,
@@ -233,6 +239,12 @@ MANUAL_COUNTRY_TO_CONTINENT = {
 }
 
 
+# Source files of the four GHG loaders
+HISTORICAL_CSV = "dataset/ALL GHG_historical_emissions.csv"
+WORLDWIDE_CSV = "dataset/Greenhouse Gas Emissions worldwide.csv"
+CARBON_CSV = "dataset/carbon_emissions.csv"
+INVENTORY_CSV = "dataset/greenhouse_gas_inventory_data_data.csv"
+
 # Gas columns from the "worldwide" dataset
 GAS_COLUMN_MAP_WORLDWIDE = {
     'co2_gigagrams': 'CO2',
@@ -262,6 +274,13 @@ def _get_gas_from_category(category):
         return 'Total GHG'
     return 'Unknown'
 
+def _classify_gas(categories: pd.Series) -> pd.Series:
+    """Vectorized ``_get_gas_from_category``: each distinct category is classified once."""
+    codes, uniques = pd.factorize(categories)
+    # Trailing None is picked by the -1 code factorize gives missing categories
+    lookup = np.array([_get_gas_from_category(c) for c in uniques] + [None], dtype=object)
+    return pd.Series(lookup[codes], index=categories.index, name='gas')
+
 
 @lru_cache(maxsize=None)
 def _get_continent(country_name):
@@ -274,118 +293,108 @@ def _get_continent(country_name):
     return MANUAL_COUNTRY_TO_CONTINENT.get(normalized_name, 'Unknown')
 
 
-@lru_cache(maxsize=1)
+@cached(version=lambda: source_version(HISTORICAL_CSV))
 def load_historical_data() -> pd.DataFrame:
     """Loads and processes the historical total GHG emissions data from 'ALL GHG_historical_emissions.csv'."""
-    df = pd.read_csv("dataset/ALL GHG_historical_emissions.csv")
-    df = df.melt(id_vars=['Country', 'Data source', 'Sector', 'Gas', 'Unit'], var_name='Year', value_name='Value')
-    df = df.rename(columns={'Country': 'country', 'Gas': 'gas', 'Value': 'value', 'Year': 'year'})
-    df['country'] = df['country'].replace(COUNTRY_NAME_MAP).dropna()
-    df['year'] = pd.to_numeric(df['year'], errors='coerce')
-    df['value'] = pd.to_numeric(df['value'].astype(str).str.replace(',', ''), errors='coerce')
-    df.loc[df['Unit'] == 'MtCO₂e', 'value'] *= 1000 # Convert Mt to Gg
-    df['gas'] = 'Total GHG'
-    return df[['country', 'year', 'gas', 'value']].dropna()
+    def build():
+        df = pd.read_csv(HISTORICAL_CSV)
+        df = df.melt(id_vars=['Country', 'Data source', 'Sector', 'Gas', 'Unit'], var_name='Year', value_name='Value')
+        df = df.rename(columns={'Country': 'country', 'Gas': 'gas', 'Value': 'value', 'Year': 'year'})
+        df['country'] = df['country'].replace(COUNTRY_NAME_MAP).dropna()
+        df['year'] = pd.to_numeric(df['year'], errors='coerce')
+        df['value'] = pd.to_numeric(df['value'].astype(str).str.replace(',', ''), errors='coerce')
+        df.loc[df['Unit'] == 'MtCO₂e', 'value'] *= 1000 # Convert Mt to Gg
+        df['gas'] = 'Total GHG'
+        return df[['country', 'year', 'gas', 'value']].dropna()
+    return cached_frame('ghg_historical', [HISTORICAL_CSV], build)
 
-@lru_cache(maxsize=1)
+@cached(version=lambda: source_version(WORLDWIDE_CSV))
 def load_worldwide_data() -> pd.DataFrame:
     """Loads and processes per-gas emissions from 'Greenhouse Gas Emissions worldwide.csv'."""
-    df = pd.read_csv("dataset/Greenhouse Gas Emissions worldwide.csv")
-    df = df.rename(columns={'Country or Area': 'country', 'Year': 'year'})
-    df = pd.melt(df, id_vars=['country', 'year'], value_vars=GAS_COLUMN_MAP_WORLDWIDE.keys(), var_name='gas', value_name='value')
-    df['gas'] = df['gas'].map(GAS_COLUMN_MAP_WORLDWIDE)
-    df['country'] = df['country'].replace(COUNTRY_NAME_MAP)
-    df = df.dropna(subset=['country', 'gas'])
-    return df[['country', 'year', 'gas', 'value']].dropna()
+    def build():
+        df = pd.read_csv(WORLDWIDE_CSV)
+        df = df.rename(columns={'Country or Area': 'country', 'Year': 'year'})
+        df = pd.melt(df, id_vars=['country', 'year'], value_vars=GAS_COLUMN_MAP_WORLDWIDE.keys(), var_name='gas', value_name='value')
+        df['gas'] = df['gas'].map(GAS_COLUMN_MAP_WORLDWIDE)
+        df['country'] = df['country'].replace(COUNTRY_NAME_MAP)
+        df = df.dropna(subset=['country', 'gas'])
+        return df[['country', 'year', 'gas', 'value']].dropna()
+    return cached_frame('ghg_worldwide', [WORLDWIDE_CSV], build)
 
-@lru_cache(maxsize=1)
+@cached(version=lambda: source_version(CARBON_CSV))
 def load_carbon_data() -> pd.DataFrame:
     """Loads and processes CO2 data from 'carbon_emissions.csv'."""
-    df = pd.read_csv("dataset/carbon_emissions.csv", usecols=lambda c: c not in ['Latitude', 'Longitude'])
-    df = df.melt(id_vars=['Country', 'Data source', 'Sector', 'Gas', 'Unit'], var_name='Year', value_name='Value')
-    df = df.rename(columns={'Country': 'country', 'Gas': 'gas', 'Value': 'value', 'Year': 'year'})
-    df = df[df['gas'] == 'CO2'] # Ensure only CO2 data is processed
-    df['country'] = df['country'].replace(COUNTRY_NAME_MAP).dropna()
-    df['year'] = pd.to_numeric(df['year'], errors='coerce')
-    df['value'] = pd.to_numeric(df['value'], errors='coerce')
-    df.loc[df['Unit'] == 'MtCO₂e', 'value'] *= 1000  # Convert Mt to Gg
-    return df[['country', 'year', 'gas', 'value']].dropna()
+    def build():
+        df = pd.read_csv(CARBON_CSV, usecols=lambda c: c not in ['Latitude', 'Longitude'])
+        df = df.melt(id_vars=['Country', 'Data source', 'Sector', 'Gas', 'Unit'], var_name='Year', value_name='Value')
+        df = df.rename(columns={'Country': 'country', 'Gas': 'gas', 'Value': 'value', 'Year': 'year'})
+        df = df[df['gas'] == 'CO2'] # Ensure only CO2 data is processed
+        df['country'] = df['country'].replace(COUNTRY_NAME_MAP).dropna()
+        df['year'] = pd.to_numeric(df['year'], errors='coerce')
+        df['value'] = pd.to_numeric(df['value'], errors='coerce')
+        df.loc[df['Unit'] == 'MtCO₂e', 'value'] *= 1000  # Convert Mt to Gg
+        return df[['country', 'year', 'gas', 'value']].dropna()
+    return cached_frame('ghg_carbon', [CARBON_CSV], build)
 
-@lru_cache(maxsize=1)
+@cached(version=lambda: source_version(INVENTORY_CSV))
 def load_inventory_data() -> pd.DataFrame:
     """Loads and processes data from 'greenhouse_gas_inventory_data_data.csv'."""
-    df = pd.read_csv("dataset/greenhouse_gas_inventory_data_data.csv")
-    df = df.rename(columns={'country_or_area': 'country', 'year': 'year', 'value': 'value', 'category': 'category'})
-    df['gas'] = df['category'].apply(_get_gas_from_category)
-    df = df.dropna(subset=['gas'])
-    df['country'] = df['country'].replace(COUNTRY_NAME_MAP)
-    df.loc[df['category'].str.contains('kilotonne'), 'value'] *= 1 # Convert kt to Gg
-    return df[['country', 'year', 'gas', 'value']].dropna()
+    def build():
+        df = pd.read_csv(INVENTORY_CSV)
+        df = df.rename(columns={'country_or_area': 'country', 'year': 'year', 'value': 'value', 'category': 'category'})
+        df['gas'] = _classify_gas(df['category'])
+        df = df.dropna(subset=['gas'])
+        df['country'] = df['country'].replace(COUNTRY_NAME_MAP)
+        df.loc[df['category'].str.contains('kilotonne'), 'value'] *= 1 # Convert kt to Gg
+        return df[['country', 'year', 'gas', 'value']].dropna()
+    return cached_frame('ghg_inventory', [INVENTORY_CSV], build)
 
-@lru_cache(maxsize=1)
+# Merge inputs, highest priority first: historical (Total GHG), worldwide, inventory, carbon
+GHG_SOURCES = [
+    Source('historical', HISTORICAL_CSV, load_historical_data),
+    Source('worldwide', WORLDWIDE_CSV, load_worldwide_data),
+    Source('inventory', INVENTORY_CSV, load_inventory_data),
+    Source('carbon', CARBON_CSV, load_carbon_data),
+]
+
+def data_version() -> str:
+    """Returns a key that changes whenever any GHG source file changes."""
+    return source_version(*(s.path for s in GHG_SOURCES))
+
+@cached(version=data_version)
 def load_clean_data() -> pd.DataFrame:
-    """Loads, merges, and cleans all available GHG emissions data, prioritizing sources."""
-    df_hist = load_historical_data()
-    df_world = load_worldwide_data()
-    df_inv = load_inventory_data()
-    df_carbon = load_carbon_data()
+    """Loads, merges, and cleans all available GHG emissions data, prioritizing sources.
 
-    # Prioritize: historical (Total GHG), worldwide, inventory, carbon
-    df_combined = pd.concat([df_hist, df_world, df_inv, df_carbon], ignore_index=True)
-    df_combined.drop_duplicates(subset=['country', 'year', 'gas'], keep='first', inplace=True)
-    
-    df_combined = df_combined.dropna(subset=['country', 'year', 'gas', 'value'])
-    df_combined['year'] = df_combined['year'].astype(int)
-    
-    return df_combined
+    Only the partitions of a source file that changed since the last run are
+    merged again, see ``pipeline.py``.
+    """
+    return load_merged(GHG_SOURCES)
+
+def get_emissions_query() -> EmissionsQuery:
+    """Returns the indexed query object over :func:`load_clean_data`."""
+    return _emissions_query(data_version())
+
+@lru_cache(maxsize=1)
+def _emissions_query(version: str) -> EmissionsQuery:
+    # Keyed by data version so a replaced source file is picked up without a restart
+    return EmissionsQuery(load_clean_data(), _get_continent)
 
 def get_continent_emissions(gas: str, year: int) -> pd.DataFrame:
     """Calculate total emissions per continent for a given gas and year, merging Oceania and Unknown as 'Rest of the World'."""
-    df = load_clean_data()
-    # Add continent information for the calculation
-    df['continent'] = df['country'].apply(_get_continent)
-    df_year = df[(df['year'] == year) & (df['gas'] == gas)]
-    continent_emissions = df_year.groupby('continent')['value'].sum().reset_index()
-    # Merge Oceania and Unknown as 'Rest of the World'
-    mask = continent_emissions['continent'].isin(['Oceania', 'Unknown'])
-    rest_sum = continent_emissions.loc[mask, 'value'].sum()
-    continent_emissions = continent_emissions[~mask]
-    if rest_sum > 0:
-        continent_emissions = pd.concat([
-            continent_emissions,
-            pd.DataFrame({'continent': ['Rest of the World'], 'value': [rest_sum]})
-        ], ignore_index=True)
-    return continent_emissions
+    return get_emissions_query().continent_emissions(gas, year)
 
 def available_gases():
     """Returns a list of available gases from the dataset."""
-    return sorted(load_clean_data()['gas'].unique())
+    return list(get_emissions_query().gases)
 
 def latest_year(gas: str = None) -> int:
     """Returns the most recent year in the dataset, optionally for a specific gas."""
-    df = load_clean_data()
-    if gas:
-        gas_df = df[df['gas'] == gas]
-        if not gas_df.empty:
-            return gas_df['year'].max()
-    return df['year'].max()
+    return get_emissions_query().latest_year(gas)
 
 def get_top_bottom_countries(gas: str, n: int = 5):
     """Gets the top and bottom N emitting countries for the latest year for that gas."""
-    df = load_clean_data()
-    gas_df = df[df['gas'] == gas]
-    
-    if gas_df.empty:
-        return pd.DataFrame(), pd.DataFrame()
-        
-    latest = gas_df['year'].max()
-    gas_df_latest = gas_df[gas_df['year'] == latest]
-    
-    top_countries = gas_df_latest.nlargest(n, 'value')
-    bottom_countries = gas_df_latest[gas_df_latest['value'] > 0].nsmallest(n, 'value')
-    
-    return top_countries, bottom_countries
+    return get_emissions_query().top_bottom(gas, n)
 
 def get_all_countries():
     """Returns a sorted list of all unique countries."""
-    return sorted(load_clean_data()['country'].unique()) 
\ No newline at end of file
+    return list(get_emissions_query().countries)
@@ -6,24 +6,25 @@ from .data import (
     available_gases,
     get_all_countries,
     latest_year,
-    load_clean_data,
+    get_emissions_query,
     get_continent_emissions,
 )
+from .racing_bar import TOP_N
 
 
 def create_layout():
     gases = available_gases()
     countries = get_all_countries()
-    df = load_clean_data()
+    query = get_emissions_query()
 
-    min_year, max_year = int(df['year'].min()), int(df['year'].max())
+    min_year, max_year = query.year_range()
 
     # --- Continent GHG emissions stacked bar chart for latest year ---
     # Determine latest common year across all selected gases
-    df_years = load_clean_data()
-    common_years = set(df_years['year'].unique())
+    common_years = None
     for g in gases:
-        common_years &= set(df_years[df_years['gas'] == g]['year'].unique())
+        years = set(query.rows(g)['year'].unique())
+        common_years = years if common_years is None else common_years & years
     if common_years:
         latest_yr = max(common_years)
     else:
@@ -35,8 +36,7 @@ def create_layout():
     for gas in gases:
         cont_df = get_continent_emissions(gas, latest_yr)
         if not cont_df.empty:
-            cont_df['gas'] = gas
-            continent_data.append(cont_df)
+            continent_data.append(cont_df.assign(gas=gas))
     
     # Combine all gas data
     all_cont_df = pd.concat(continent_data, ignore_index=True)
@@ -157,7 +157,7 @@ def create_layout():
         ], style={'marginBottom': '20px', 'display': 'flex', 'flex-direction': 'column', 'align-items': 'center'}),
 
         # --- Racing Bar Chart Section ---
-        html.H1(id='racing-bar-title', children='Top 10 Emitting Countries - Growth', style={'font-size': '20px', 'color': 'white', 'padding-left': '10px'}),
+        html.H1(id='racing-bar-title', children=f'Top {TOP_N} Emitting Countries - Growth', style={'font-size': '20px', 'color': 'white', 'padding-left': '10px'}),
         dcc.Graph(id='ghg-racing-bar', style={"margin-bottom": "10px", 'border': '3px solid #2A547E'}),
         dcc.Interval(id='ghg-interval-component', interval=600, n_intervals=0),
         html.Div(
@@ -0,0 +1,182 @@
+"""Incremental, source-prioritized merge behind ``load_clean_data``.
+
+Each GHG source (historical, worldwide, inventory, carbon) is cleaned by its
+own loader and cached on its own. The merged frame keeps, for every
+(country, year, gas) key, the row of the highest-priority source that has
+it. Lower-priority sources only contribute keys that no higher one has
+(anti-joins on the key columns). The result is persisted under
+``.cache/ghg/`` together with a manifest of the source versions it was built
+from.
+
+When a source file is replaced, only the (gas, country) partitions it touches
+are merged again: those in the new file plus those the old file had won. Every
+other partition is copied from the persisted result as is. Workers share the
+persisted result through a lock file, so after a new release is dropped in
+one worker updates it and the others read the update.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from components.frame_cache import CACHE_DIR, cache_enabled, source_version
+
+try:
+    import fcntl
+except ImportError:  # fcntl is POSIX only; without it concurrent updates just repeat the work
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_DIR = os.path.join(CACHE_DIR, 'ghg')
+MANIFEST_PATH = os.path.join(PIPELINE_DIR, 'manifest.json')
+# Bump when the merge rules change so persisted results are rebuilt
+PIPELINE_VERSION = 1
+
+KEYS = ['country', 'year', 'gas']
+PARTITION = ['gas', 'country']
+
+
+class Source(NamedTuple):
+    """One input of the merge; earlier sources win over later ones."""
+    name: str
+    path: str
+    load: Callable[[], pd.DataFrame]
+
+
+def load_merged(sources: List[Source]) -> pd.DataFrame:
+    """Return the merged (country, year, gas, value) frame for ``sources``."""
+    versions = {s.name: source_version(s.path) for s in sources}
+    if not cache_enabled():
+        return merge_by_priority([s.load() for s in sources])[KEYS + ['value']]
+
+    try:
+        os.makedirs(PIPELINE_DIR, exist_ok=True)
+    except OSError as e:
+        logger.warning(f"Could not create {PIPELINE_DIR}, merging without persistence: {e}")
+        return merge_by_priority([s.load() for s in sources])[KEYS + ['value']]
+
+    with _merge_lock():
+        manifest, merged = _read_state()
+        order = [s.name for s in sources]
+        if manifest is None or manifest['pipeline'] != PIPELINE_VERSION or manifest['order'] != order:
+            start = time.perf_counter()
+            merged = merge_by_priority([s.load() for s in sources])
+            logger.info(f"GHG merge: full rebuild of {len(merged):,} rows in {time.perf_counter() - start:.2f}s")
+            _write_state(merged, order, versions)
+        else:
+            changed = [s for s in sources if manifest['sources'][s.name] != versions[s.name]]
+            if changed:
+                merged = _update(merged, sources, changed)
+                _write_state(merged, order, versions)
+    return merged[KEYS + ['value']]
+
+
+def merge_by_priority(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Merge ``frames`` (highest priority first) keeping one row per key.
+
+    The ``source`` column of the result holds the position of the frame each
+    row came from.
+    """
+    parts = []
+    taken = None
+    for priority, df in enumerate(frames):
+        df = df.dropna(subset=KEYS + ['value']).astype({'year': 'int64'})
+        df = df.drop_duplicates(subset=KEYS, keep='first')[KEYS + ['value']]
+        if taken is not None:
+            df = _anti_join(df, taken, KEYS)
+        df = df.assign(source=np.int8(priority))
+        parts.append(df)
+        taken = df[KEYS] if taken is None else pd.concat([taken, df[KEYS]], ignore_index=True)
+    return pd.concat(parts, ignore_index=True)
+
+
+def _update(merged, sources, changed):
+    """Re-merge the partitions touched by the ``changed`` sources."""
+    start = time.perf_counter()
+    priority = {s.name: i for i, s in enumerate(sources)}
+    frames = [s.load() for s in sources]
+    old_rows = merged['source'].isin([priority[s.name] for s in changed])
+    affected = pd.concat([frames[priority[s.name]][PARTITION] for s in changed] + [merged.loc[old_rows, PARTITION]],
+                         ignore_index=True).drop_duplicates()
+
+    kept = _anti_join(merged, affected, PARTITION)
+    remerged = merge_by_priority([_semi_join(df, affected, PARTITION) for df in frames])
+    merged = pd.concat([kept, remerged], ignore_index=True)
+    logger.info(f"GHG merge: {', '.join(s.name for s in changed)} changed, re-merged {len(affected):,} (gas, country) "
+                f"partitions ({len(remerged):,} of {len(merged):,} rows) in {time.perf_counter() - start:.2f}s")
+    return merged
+
+
+def _anti_join(left, right, on):
+    """Rows of ``left`` whose ``on`` key is not in ``right``."""
+    marked = left.merge(right[on].drop_duplicates(), on=on, how='left', indicator=True)
+    return marked.loc[marked['_merge'] == 'left_only', list(left.columns)].reset_index(drop=True)
+
+
+def _semi_join(left, right, on):
+    """Rows of ``left`` whose ``on`` key is in ``right``."""
+    return left.merge(right[on].drop_duplicates(), on=on, how='inner')[list(left.columns)]
+
+
+def _read_state():
+    try:
+        with open(MANIFEST_PATH, 'r') as f:
+            manifest = json.load(f)
+        import pyarrow.feather as feather
+        merged = feather.read_table(os.path.join(PIPELINE_DIR, manifest['file']), memory_map=True).to_pandas()
+        return manifest, merged
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring unreadable GHG merge state: {e}")
+        return None, None
+
+
+def _write_state(merged, order, versions):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    stamp = hashlib.sha1(json.dumps([PIPELINE_VERSION, order, versions], sort_keys=True).encode()).hexdigest()[:16]
+    file_name = f'merged-{stamp}.feather'
+    manifest = {'pipeline': PIPELINE_VERSION, 'order': order, 'sources': versions, 'file': file_name}
+    try:
+        path = os.path.join(PIPELINE_DIR, file_name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        # Uncompressed, so _read_state maps the file instead of decompressing it
+        feather.write_feather(pa.Table.from_pandas(merged, preserve_index=False), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+        # The manifest is replaced last so readers never see a half-written frame
+        tmp_manifest = f'{MANIFEST_PATH}.{os.getpid()}.tmp'
+        with open(tmp_manifest, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, MANIFEST_PATH)
+    except Exception as e:
+        logger.warning(f"Could not persist GHG merge: {e}")
+        return
+
+    for stale in glob.glob(os.path.join(PIPELINE_DIR, 'merged-*.feather')):
+        if os.path.basename(stale) != file_name:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+@contextmanager
+def _merge_lock():
+    """Hold an exclusive lock on ``.cache/ghg/merge.lock`` for a read-update-write cycle."""
+    with open(os.path.join(PIPELINE_DIR, 'merge.lock'), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,135 @@
+"""Indexed lookups over the merged GHG emissions frame.
+
+:class:`EmissionsQuery` sorts the output of ``load_clean_data()`` once by
+(gas, year, country) and keeps integer codes for gas and country, so a
+lookup for one gas or one (gas, year) pair is a binary search over offsets,
+not a boolean mask over every row. A second permutation ordered by
+(gas, country, year) serves per-country series the same way. Continents are
+resolved once per distinct country when the index is built.
+
+Aggregates that callbacks ask for repeatedly (continent totals, top and
+bottom emitters, per-country linear trends) are memoized per instance in
+bounded LRU caches. The frames they return are shared between callers, so
+they are frozen (:func:`~components.shared.freeze_frame`) and raise on
+modification.
+"""
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from components.shared import freeze_frame
+from components.trends import grouped_trends
+
+# Continents folded into one slice of the continent pie
+REST_OF_WORLD = ('Oceania', 'Unknown')
+
+
+class EmissionsQuery:
+    """Read-only index over (country, year, gas, value) rows."""
+
+    def __init__(self, df: pd.DataFrame, continent_of: Callable[[str], str], cache_size: int = 128):
+        gas_codes, gases = pd.factorize(df['gas'], sort=True)
+        country_codes, countries = pd.factorize(df['country'], sort=True)
+        years = df['year'].to_numpy(dtype=np.int64)
+        order = np.lexsort((country_codes, years, gas_codes))
+
+        self.gases = list(gases)
+        self.countries = list(countries)
+        self._gas_index = {gas: code for code, gas in enumerate(self.gases)}
+        self._country_index = {country: code for code, country in enumerate(self.countries)}
+
+        continents = np.array([continent_of(c) for c in self.countries], dtype=object)
+        self._gas = gas_codes[order]
+        self._year = years[order]
+        self._country = country_codes[order]
+        self.df = freeze_frame(pd.DataFrame({
+            'country': np.asarray(countries)[self._country],
+            'year': self._year,
+            'gas': np.asarray(gases)[self._gas],
+            'value': df['value'].to_numpy()[order],
+            'continent': continents[self._country],
+        }))
+        # Rows of gas g occupy [offsets[g], offsets[g + 1]) in both orderings
+        self._gas_offsets = np.searchsorted(self._gas, np.arange(len(self.gases) + 1))
+        self._by_country = np.lexsort((self._year, self._country, self._gas))
+        self._country_sorted = self._country[self._by_country]
+
+        self.continent_emissions = lru_cache(maxsize=cache_size)(self._continent_emissions)
+        self.top_bottom = lru_cache(maxsize=cache_size)(self._top_bottom)
+        self.country_trends = lru_cache(maxsize=cache_size)(self._country_trends)
+
+    def _gas_bounds(self, gas: str) -> Tuple[int, int]:
+        code = self._gas_index.get(gas)
+        if code is None:
+            return 0, 0
+        return int(self._gas_offsets[code]), int(self._gas_offsets[code + 1])
+
+    def rows(self, gas: str, year: Optional[int] = None) -> pd.DataFrame:
+        """Rows for ``gas`` (and ``year``), ordered by year then country."""
+        start, stop = self._gas_bounds(gas)
+        if year is not None:
+            years = self._year[start:stop]
+            start, stop = (start + int(np.searchsorted(years, year, 'left')),
+                           start + int(np.searchsorted(years, year, 'right')))
+        return self.df.iloc[start:stop]
+
+    def country_rows(self, gas: str, countries: Iterable[str]) -> pd.DataFrame:
+        """Rows for ``gas`` and the given countries, ordered by country then year."""
+        start, stop = self._gas_bounds(gas)
+        sorted_codes = self._country_sorted[start:stop]
+        positions = []
+        for country in countries:
+            code = self._country_index.get(country)
+            if code is None:
+                continue
+            lo = start + int(np.searchsorted(sorted_codes, code, 'left'))
+            hi = start + int(np.searchsorted(sorted_codes, code, 'right'))
+            positions.append(self._by_country[lo:hi])
+        if not positions:
+            return self.df.iloc[0:0]
+        return self.df.iloc[np.concatenate(positions)]
+
+    def year_range(self, gas: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """First and last year with data for ``gas`` (any gas when None)."""
+        if gas is None:
+            if not len(self._year):
+                return None
+            return int(self._year.min()), int(self._year.max())
+        start, stop = self._gas_bounds(gas)
+        if start == stop:
+            return None
+        return int(self._year[start]), int(self._year[stop - 1])
+
+    def latest_year(self, gas: Optional[str] = None) -> Optional[int]:
+        year_range = self.year_range(gas)
+        if year_range is None and gas is not None:
+            year_range = self.year_range()
+        return year_range[1] if year_range else None
+
+    def _continent_emissions(self, gas: str, year: int) -> pd.DataFrame:
+        df_year = self.rows(gas, year)
+        totals = df_year.groupby('continent', sort=True)['value'].sum()
+        mask = totals.index.isin(REST_OF_WORLD)
+        rest_sum = totals[mask].sum()
+        totals = totals[~mask]
+        if rest_sum > 0:
+            totals = pd.concat([totals, pd.Series({'Rest of the World': rest_sum})])
+        return freeze_frame(totals.rename_axis('continent').reset_index(name='value'))
+
+    def _top_bottom(self, gas: str, n: int = 5) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        latest = self.year_range(gas)
+        if latest is None:
+            return freeze_frame(pd.DataFrame()), freeze_frame(pd.DataFrame())
+        df_latest = self.rows(gas, latest[1])
+        top = df_latest.nlargest(n, 'value')
+        bottom = df_latest[df_latest['value'] > 0].nsmallest(n, 'value')
+        return freeze_frame(top), freeze_frame(bottom)
+
+    def _country_trends(self, gas: str, since: Optional[int] = None) -> pd.DataFrame:
+        """Linear trend of every country's ``gas`` emissions per year (see :func:`grouped_trends`)."""
+        df = self.rows(gas)
+        if since is not None:
+            df = df[df['year'] >= since]
+        return freeze_frame(grouped_trends(df, 'year', 'value', by='country'))
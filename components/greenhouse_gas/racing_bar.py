@@ -0,0 +1,99 @@
+"""Animated top-N racing bar chart for the GHG page.
+
+The ranking is computed in one pass: emissions are summed per (year,
+country), ranked within each year and cut at N, then split into frames by
+the offset where each year starts. Bar labels use a ``texttemplate`` so no
+value is formatted in Python. The finished figure is stored on disk per gas,
+N, stride and data version (see :func:`components.figure_cache.stored_figure`),
+so workers and restarts share one build.
+
+``GHG_RACING_TOP_N`` (default 10) and ``GHG_RACING_STRIDE`` (default 1, i.e.
+one frame per year) configure the chart.
+"""
+import os
+import re
+
+import numpy as np
+
+from components.cache import cached
+from components.figure_cache import stored_figure
+from .data import data_version, get_emissions_query
+
+TOP_N = int(os.environ.get('GHG_RACING_TOP_N', 10))
+FRAME_STRIDE = int(os.environ.get('GHG_RACING_STRIDE', 1))
+
+BAR_STYLE = dict(type='bar', orientation='h', texttemplate='%{x:,.0f}', textposition='inside',
+                 insidetextanchor='end', textfont={'color': 'white'})
+
+
+def top_n_per_year(gas_df, n=TOP_N):
+    """Return the ``n`` largest emitters of every year, sorted by year then value."""
+    totals = gas_df.groupby(['year', 'country'], as_index=False, sort=False)['value'].sum()
+    rank = totals.groupby('year')['value'].rank(method='first', ascending=False)
+    return totals[rank <= n].sort_values(['year', 'value'], kind='stable').reset_index(drop=True)
+
+
+def build_racing_bar_figure(gas, n=TOP_N, stride=FRAME_STRIDE):
+    """Build the racing bar figure for ``gas`` as a dict, or None when there is no data."""
+    gas_df = get_emissions_query().rows(gas)
+    if gas_df.empty:
+        return None
+
+    top = top_n_per_year(gas_df, n)
+    years, starts = np.unique(top['year'].to_numpy(), return_index=True)
+    offsets = np.append(starts, len(top))
+    # Every stride-th year, always ending on the latest one
+    positions = list(range(0, len(years), max(stride, 1)))
+    if positions[-1] != len(years) - 1:
+        positions.append(len(years) - 1)
+
+    values = top['value'].to_numpy()
+    countries = top['country'].to_numpy()
+    max_val = values.max() * 1.2
+
+    frames = []
+    for i in positions:
+        rows = slice(offsets[i], offsets[i + 1])
+        frames.append(dict(
+            data=[dict(BAR_STYLE, x=values[rows], y=countries[rows])],
+            name=str(years[i]),
+            layout=dict(title_text=f'Top {n} {gas} Emitters - {years[i]}', xaxis=dict(range=[0, max_val])),
+        ))
+
+    layout = dict(
+        xaxis=dict(range=[0, max_val], showticklabels=False, showgrid=False, zeroline=False, title_text=''),
+        yaxis=dict(showticklabels=True, showgrid=False, zeroline=False, title_text='', automargin=True),
+        title_text=frames[0]['layout']['title_text'],
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font={'color': 'black'},
+        height=600,
+        updatemenus=[dict(
+            type="buttons",
+            direction="left",
+            x=1.05,
+            xanchor="left",
+            y=1,
+            yanchor="top",
+            buttons=[
+                dict(label="Play",
+                     method="animate",
+                     args=[None, {"frame": {"duration": 500, "redraw": True},
+                                  "fromcurrent": True, "transition": {"duration": 300, "easing": "linear"}}]),
+                dict(label="Pause",
+                     method="animate",
+                     args=[[None], {"frame": {"duration": 0, "redraw": False}, "mode": "immediate",
+                                    "transition": {"duration": 0}}])
+            ],
+        )],
+    )
+    return dict(data=frames[0]['data'], layout=layout, frames=frames)
+
+
+@cached(version=data_version)
+def get_racing_bar_figure(gas, n=TOP_N, stride=FRAME_STRIDE):
+    """Return the racing bar figure for ``gas``, built once per data version."""
+    if get_emissions_query().year_range(gas) is None:
+        return None
+    name = f"racing_bar-{re.sub(r'[^A-Za-z0-9]+', '_', gas)}-n{n}-s{stride}"
+    return stored_figure(name, data_version(), lambda: build_racing_bar_figure(gas, n, stride))
@@ -0,0 +1,101 @@
+"""Page registry used by the URL router in ``app.py``.
+
+Each dashboard is registered with the module that builds it and the name of
+its layout factory. Nothing is imported or loaded until the first request for
+that path (or an explicit warm-up), so worker start-up only pays for the
+callback modules and the pages people actually visit.
+"""
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Page:
+    """A lazily loaded dashboard page."""
+
+    def __init__(self, path, module, factory, callbacks=None):
+        self.path = path
+        self.module = module
+        self.factory = factory
+        self.callbacks = callbacks
+        self.load_seconds = None
+        self._factory = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._factory is not None
+
+    def render(self):
+        """Return the page layout, importing and building the page on first use."""
+        if self._factory is not None:
+            return self._factory()
+
+        with self._lock:
+            if self._factory is not None:
+                return self._factory()
+            start = time.perf_counter()
+            factory = getattr(importlib.import_module(self.module), self.factory)
+            # The first call builds (and caches) the page's data and figures
+            layout = factory()
+            self.load_seconds = time.perf_counter() - start
+            self._factory = factory
+            logger.info(f"Loaded page {self.path} in {self.load_seconds:.2f}s")
+            return layout
+
+
+class PageRegistry:
+    """Maps URL paths to lazily loaded pages."""
+
+    def __init__(self):
+        self._pages = {}
+
+    def register(self, path, module, factory, callbacks=None):
+        """Register a page; ``callbacks`` is a module imported at start-up for its side effects."""
+        self._pages[path] = Page(path, module, factory, callbacks)
+
+    def register_callbacks(self):
+        """Import every page's callback module.
+
+        Dash only collects ``@callback`` registrations before the first request,
+        so these imports must happen at start-up. Callback modules must not load
+        data at import time.
+        """
+        for page in self._pages.values():
+            if page.callbacks:
+                importlib.import_module(page.callbacks)
+
+    def render(self, pathname, default=None):
+        page = self._pages.get(pathname)
+        if page is None:
+            return default
+        return page.render()
+
+    def warm_up(self, paths=None):
+        """Load the given pages now (all pages if ``paths`` is None or 'all').
+
+        ``paths`` may be a list or a comma separated string such as the value of
+        the ``PRELOAD_PAGES`` environment variable.
+        """
+        if isinstance(paths, str):
+            paths = None if paths.strip() == 'all' else [p.strip() for p in paths.split(',') if p.strip()]
+        if paths is None:
+            paths = list(self._pages)
+
+        start = time.perf_counter()
+        for path in paths:
+            if path not in self._pages:
+                logger.warning(f"Cannot warm up unknown page {path}")
+                continue
+            try:
+                self._pages[path].render()
+            except Exception as e:
+                logger.error(f"Error warming up page {path}: {e}", exc_info=True)
+        logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s: {self.timings()}")
+
+    def timings(self):
+        """Return ``{path: seconds}`` for every page that has been loaded."""
+        return {path: round(page.load_seconds, 3) for path, page in self._pages.items() if page.loaded}
@@ -0,0 +1,59 @@
+"""Wide-to-long reshaping of year-suffixed columns.
+
+Several source tables spread one measure over a column per year
+(``PM_1990``/``PM_2021`` in ``deathbyair.csv``, ``Forest Area, 1990`` to
+``Forest Area, 2020`` in ``Forest_Area.csv``). :func:`wide_to_long` parses
+the measure and the year out of the column names with a regular expression
+and turns them into one row per (id, year) with one column per measure. The
+result is built from whole columns at once instead of row by row.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# "<measure><separator><year>", e.g. "PM_1990" or "Forest Area, 2020"
+YEAR_SUFFIX = r'^(?P<measure>.+?)[\s_,]+(?P<year>\d{4})$'
+
+
+def year_columns(columns, pattern=YEAR_SUFFIX):
+    """``(column, measure, year)`` of every column name matching ``pattern``.
+
+    ``pattern`` needs the named groups ``measure`` and ``year``.
+    """
+    regex = re.compile(pattern)
+    parsed = []
+    for column in columns:
+        match = regex.match(str(column))
+        if match:
+            parsed.append((column, match.group('measure'), int(match.group('year'))))
+    return parsed
+
+
+def wide_to_long(df, id_vars, pattern=YEAR_SUFFIX, measures=None, year_name='Year'):
+    """Reshape the year-suffixed columns of ``df`` into rows.
+
+    Returns ``id_vars``, ``year_name`` and one column per measure, with the
+    rows of each input row together and the years in ascending order. The
+    years are those of any matching column; a measure missing for a year is
+    NaN. ``measures`` selects and renames measures (``{'PM': 'Outdoor
+    particulate matter'}``), in that order; by default every measure found
+    is kept under its own name.
+    """
+    id_vars = [id_vars] if isinstance(id_vars, str) else list(id_vars)
+    parsed = year_columns(df.columns, pattern)
+    if measures is None:
+        measures = {measure: measure for _, measure, _ in parsed}
+    parsed = [item for item in parsed if item[1] in measures]
+    years = sorted({year for _, _, year in parsed})
+
+    n_years = len(years)
+    out = {name: np.repeat(df[name].to_numpy(), n_years) for name in id_vars}
+    out[year_name] = np.tile(np.asarray(years, dtype=np.int64), len(df))
+    for measure, name in measures.items():
+        by_year = {year: column for column, m, year in parsed if m == measure}
+        block = pd.DataFrame({year: df[by_year[year]] if year in by_year else np.nan for year in years},
+                             index=df.index, columns=years)
+        # Row-major order puts the years of one input row next to each other
+        out[name] = block.to_numpy().ravel()
+    return pd.DataFrame(out)
@@ -1,29 +1,178 @@
+import io
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import logging
 import os
 
+from components.frame_cache import CACHE_DIR, cached_frame, source_version
+from components.trends import grouped_trends
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SEA_LEVEL_CSV = 'dataset/Global_sea_level_rise.csv'
+
+def _read_sea_level_csv():
+    data = pd.read_csv(SEA_LEVEL_CSV)
+    data.rename(columns={
+        'year': 'Year',
+        'mmfrom1993-2008average': 'Sea Level'
+    }, inplace=True)
+
+    # Ensure data types
+    data['Year'] = pd.to_numeric(data['Year'], errors='coerce')
+    data['Sea Level'] = pd.to_numeric(data['Sea Level'], errors='coerce')
+
+    # Drop any rows with NaN values
+    return data.dropna()
+
+SEA_ICE_CSV = 'dataset/seaice.csv'
+# Columns kept from seaice.csv; 'Source Data' (the raw file list) is dropped
+SEA_ICE_COLUMNS = ['Year', 'Month', 'Day', 'Extent', 'Missing', 'hemisphere']
+SEA_ICE_FIELDS = 7
+QUARANTINE_DIR = os.path.join(CACHE_DIR, 'quarantine')
+_BLOCK_BYTES = 64 << 20
+
+
+def _read_sea_ice_csv(path=SEA_ICE_CSV):
+    """Read seaice.csv with the C parser, quarantining lines it cannot use.
+
+    Each block of the file first goes through :func:`_clean_sea_ice_block`,
+    which strips whitespace, drops the free-text 'Source Data' field (it may
+    contain commas) and sets aside lines with too few fields. Rows whose
+    numbers or date do not parse are set aside as well. Set-aside lines are
+    written to ``.cache/quarantine/<file>.csv`` instead of being skipped
+    silently.
+    """
+    frames, line_numbers, quarantine = [], [], []
+    with open(path, 'rb') as f:
+        f.readline()  # header
+        line = 2
+        tail = b''
+        while True:
+            chunk = f.read(_BLOCK_BYTES)
+            block = tail + chunk
+            if chunk:
+                cut = block.rfind(b'\n') + 1
+                block, tail = block[:cut], block[cut:]
+            if block:
+                clean, kept, rejected = _clean_sea_ice_block(block, line)
+                line += block.count(b'\n') + (not block.endswith(b'\n'))
+                quarantine.extend(rejected)
+                if len(kept):
+                    frames.append(pd.read_csv(io.BytesIO(clean), header=None, names=SEA_ICE_COLUMNS,
+                                              dtype={'hemisphere': 'category'}, engine='c'))
+                    line_numbers.append(kept)
+            if not chunk:
+                break
+
+    if not frames:
+        _write_quarantine(path, quarantine)
+        return pd.DataFrame(columns=['Date', 'Year', 'Month', 'DayOfYear', 'Extent'])
+    raw = pd.concat(frames, ignore_index=True)
+    df, rejected = _assemble_sea_ice(raw, np.concatenate(line_numbers))
+    quarantine.extend(rejected)
+    _write_quarantine(path, quarantine)
+    return df
+
+
+def _clean_sea_ice_block(block, first_line):
+    """Reduce a block of whole lines to ``Year,Month,Day,Extent,Missing,hemisphere`` rows.
+
+    Works on the raw bytes with numpy: no Python loop over lines. Returns the
+    cleaned bytes, the file line number of every kept row and a list of
+    ``(line, reason, text)`` for lines with fewer than seven fields.
+    """
+    buf = np.frombuffer(block, dtype=np.uint8)
+    ends = np.flatnonzero(buf == ord('\n'))
+    if not len(ends) or ends[-1] != len(buf) - 1:
+        ends = np.append(ends, len(buf))  # last line without a newline
+    starts = np.concatenate(([0], ends[:-1] + 1))
+
+    commas = np.flatnonzero(buf == ord(','))
+    first = np.searchsorted(commas, starts)
+    count = np.searchsorted(commas, ends) - first
+    # Only lines without a comma can be blank; there are few of them
+    blank = np.zeros(len(starts), dtype=bool)
+    for i in np.flatnonzero(count == 0):
+        blank[i] = not block[starts[i]:ends[i]].strip()
+    good = ~blank & (count >= SEA_ICE_FIELDS - 1)
+    bad = ~blank & ~good
+
+    # +1/-1 markers whose running sum is positive over the bytes to drop:
+    # whole bad or blank lines, and 'Source Data' between the 5th and last comma.
+    # Positions are unique within each update, so plain fancy indexing is enough
+    marks = np.zeros(len(buf) + 1, dtype=np.int8)
+    dropped = np.flatnonzero(bad | blank)
+    marks[starts[dropped]] += 1
+    marks[np.minimum(ends[dropped] + 1, len(buf))] -= 1
+    rows = np.flatnonzero(good)
+    marks[commas[first[rows] + 4]] += 1  # comma after 'Missing'
+    marks[commas[first[rows] + count[rows] - 1]] -= 1
+    whitespace = (buf == ord(' ')) | (buf == ord('\t')) | (buf == ord('\r'))
+    keep = (np.cumsum(marks[:-1], dtype=np.int8) == 0) & ~whitespace
+
+    rejected = [(first_line + i, f'expected {SEA_ICE_FIELDS} fields, found {count[i] + 1}',
+                 block[starts[i]:ends[i]].decode('utf-8', 'replace').rstrip('\r'))
+                for i in np.flatnonzero(bad)]
+    return buf[keep].tobytes(), first_line + rows, rejected
+
+
+def _assemble_sea_ice(raw, line_numbers):
+    """Validate and type the parsed columns and build ``Date``/``DayOfYear`` arithmetically."""
+    year, month, day, extent, missing = (pd.to_numeric(raw[c], errors='coerce').to_numpy(dtype=np.float64)
+                                         for c in SEA_ICE_COLUMNS[:5])
+    whole = lambda a: np.isfinite(a) & (a == np.round(a))
+    valid = whole(year) & whole(month) & whole(day) & (month >= 1) & (month <= 12) & (day >= 1) & np.isfinite(extent)
+
+    # Months since 1970 -> first day of the month; the next month gives its length
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype(np.int64)
+    month_start = months.astype('datetime64[M]').astype('datetime64[D]')
+    month_length = ((months + 1).astype('datetime64[M]').astype('datetime64[D]') - month_start).astype(np.int64)
+    valid &= day <= month_length
+
+    reasons = np.where(~np.isfinite(extent), 'missing or invalid extent', 'invalid date')
+    texts = raw[~valid].astype(str).agg(','.join, axis=1) if (~valid).any() else []
+    rejected = list(zip(line_numbers[~valid].tolist(), reasons[~valid].tolist(), list(texts)))
+
+    year, month, day = year[valid].astype(np.int16), month[valid].astype(np.int16), day[valid].astype(np.int16)
+    dates = month_start[valid] + (day.astype(np.int64) - 1)
+    year_start = (year.astype(np.int64) - 1970).astype('datetime64[Y]').astype('datetime64[D]')
+    df = pd.DataFrame({
+        'Year': year,
+        'Month': month,
+        'Day': day,
+        'Extent': extent[valid].astype(np.float32),
+        'Missing': missing[valid].astype(np.float32),
+        'hemisphere': raw['hemisphere'][valid].astype('category').reset_index(drop=True),
+        'Date': dates.astype('datetime64[ns]'),
+        'DayOfYear': ((dates - year_start).astype(np.int64) + 1).astype(np.int16),
+    })
+    return df, rejected
+
+
+def _write_quarantine(path, rows):
+    """Write the lines set aside while reading ``path`` to the quarantine directory."""
+    report = os.path.join(QUARANTINE_DIR, os.path.basename(path))
+    if not rows:
+        if os.path.exists(report):
+            os.remove(report)
+        return
+    try:
+        os.makedirs(QUARANTINE_DIR, exist_ok=True)
+        pd.DataFrame(sorted(rows), columns=['line', 'reason', 'text']).to_csv(report, index=False)
+    except OSError as e:
+        logger.warning(f"Could not write quarantine report {report}: {e}")
+        return
+    logger.warning(f"{path}: quarantined {len(rows)} line(s), see {report}")
+
 def load_sea_level_data():
     """Load and process sea level data with error handling."""
     try:
         logger.info("Loading sea level data...")
-        data = pd.read_csv('dataset/Global_sea_level_rise.csv')
-        data.rename(columns={
-            'year': 'Year',
-            'mmfrom1993-2008average': 'Sea Level'
-        }, inplace=True)
-        
-        # Ensure data types
-        data['Year'] = pd.to_numeric(data['Year'], errors='coerce')
-        data['Sea Level'] = pd.to_numeric(data['Sea Level'], errors='coerce')
-        
-        # Drop any rows with NaN values
-        data = data.dropna()
+        data = cached_frame('sea_level', [SEA_LEVEL_CSV], _read_sea_level_csv)
         logger.info(f"Successfully loaded sea level data with {len(data)} rows")
         return data
     except Exception as e:
@@ -34,41 +183,78 @@ def load_sea_ice_data():
     """Load and process sea ice data with robust error handling."""
     try:
         logger.info("Loading sea ice data...")
-        # Manually define column names to handle whitespace issues
-        col_names = ['Year', 'Month', 'Day', 'Extent', 'Missing', 'Source Data', 'hemisphere']
-        # Use a more robust parser engine and specify names
-        df = pd.read_csv('dataset/seaice.csv', header=0, names=col_names, skipinitialspace=True, engine='python', on_bad_lines='skip')
-
-        logger.info(f"Successfully read seaice.csv, columns are: {df.columns.tolist()}")
-
-        # Clean column names just in case
-        df.columns = [col.strip() for col in df.columns]
-
-        # Convert date from Year, Month, Day columns
-        df['Date'] = pd.to_datetime(df[['Year', 'Month', 'Day']].astype(int))
-        
-        # Extract additional date features
-        df['DayOfYear'] = df['Date'].dt.dayofyear
-        
-        # Ensure Extent is numeric and handle any spaces
-        df['Extent'] = pd.to_numeric(df['Extent'], errors='coerce')
-        
-        # Drop any rows with NaN values in critical columns
-        df = df.dropna(subset=['Date', 'Extent'])
-        
+        df = cached_frame('sea_ice', [SEA_ICE_CSV], _read_sea_ice_csv, version=2)
         logger.info(f"Successfully processed sea ice data with {len(df)} rows")
         return df
     except Exception as e:
         logger.error(f"Error loading sea ice data: {e}", exc_info=True)
         return pd.DataFrame(columns=['Date', 'Year', 'Month', 'DayOfYear', 'Extent'])
 
+def data_version():
+    """Returns a key that changes whenever either sea-level source file changes."""
+    return source_version(SEA_LEVEL_CSV, SEA_ICE_CSV)
+
+# Products derived from seaice.csv, persisted next to the cleaned frame. They
+# depend on _read_sea_ice_csv too, so bump DERIVED_VERSION with its version.
+DERIVED_VERSION = 1
+
+def load_seasonal_cycle():
+    """Seasonal cycle of ``calculate_seasonal_cycle``, computed once per data version."""
+    return cached_frame('sea_ice_seasonal', [SEA_ICE_CSV],
+                        lambda: calculate_seasonal_cycle(load_sea_ice_data()), version=DERIVED_VERSION)
+
+def load_monthly_extent():
+    """Mean extent per (Year, Month), computed once per data version."""
+    return cached_frame('sea_ice_monthly', [SEA_ICE_CSV],
+                        lambda: calculate_monthly_trends(load_sea_ice_data())[0], version=DERIVED_VERSION)
+
+def load_extent_series():
+    """Daily extent with its 30-day rolling mean/std and the long-term linear trend.
+
+    Columns: ``Date``, ``Extent``, ``Extent_smoothed``, ``Extent_std``,
+    ``Trend``. Computed once per data version.
+    """
+    return cached_frame('sea_ice_extent', [SEA_ICE_CSV], _build_extent_series, version=DERIVED_VERSION)
+
+def load_annual_extremes():
+    """Rows of the lowest (``Kind`` 'min') and highest ('max') extent of every year."""
+    return cached_frame('sea_ice_extremes', [SEA_ICE_CSV], _build_annual_extremes, version=DERIVED_VERSION)
+
+def load_extent_trend():
+    """Long-term linear trend of the daily extent per fractional year (one row, ``TREND_COLUMNS``)."""
+    return cached_frame('sea_ice_extent_trend', [SEA_ICE_CSV], _build_extent_trend, version=DERIVED_VERSION)
+
+def _fractional_year(dates):
+    return dates.dt.year + (dates.dt.dayofyear - 1) / 365.25
+
+def _daily_extent():
+    return load_sea_ice_data()[['Date', 'Extent']].dropna(subset=['Extent'])
+
+def _build_extent_trend():
+    df = _daily_extent()
+    return grouped_trends(df.assign(YearFrac=_fractional_year(df['Date'])), 'YearFrac', 'Extent')
+
+def _build_extent_series():
+    df = _daily_extent()
+    rolling = df['Extent'].rolling(window=30, center=True, min_periods=1)
+    fit = load_extent_trend().iloc[0]
+    return df.assign(Extent_smoothed=rolling.mean(), Extent_std=rolling.std(),
+                     Trend=fit['slope'] * _fractional_year(df['Date']) + fit['intercept']).reset_index(drop=True)
+
+def _build_annual_extremes():
+    df = _daily_extent()
+    by_year = df.groupby(df['Date'].dt.year)['Extent']
+    mins = df.loc[by_year.idxmin()].assign(Kind='min')
+    maxs = df.loc[by_year.idxmax()].assign(Kind='max')
+    return pd.concat([mins, maxs], ignore_index=True)
+
 def calculate_seasonal_cycle(df):
     """
     Calculates the mean and standard deviation of sea ice extent for each day of the year.
     This helps in visualizing the annual seasonal cycle.
     """
-    df['DayOfYear'] = df['Date'].dt.dayofyear
-    seasonal_stats = df.groupby('DayOfYear')['Extent'].agg(['mean', 'std']).reset_index()
+    day_of_year = df['Date'].dt.dayofyear.rename('DayOfYear')
+    seasonal_stats = df.groupby(day_of_year)['Extent'].agg(['mean', 'std']).reset_index()
     seasonal_stats.rename(columns={'mean': 'Mean_Extent', 'std': 'Std_Extent'}, inplace=True)
     # Apply a 7-day rolling mean for smoothing
     seasonal_stats['Smoothed_Mean_Extent'] = seasonal_stats['Mean_Extent'].rolling(window=7, center=True, min_periods=1).mean()
@@ -83,26 +269,12 @@ def calculate_monthly_trends(df):
             return pd.DataFrame(), pd.DataFrame(columns=['Month', 'Trend'])
             
         monthly_avg = df.groupby(['Year', 'Month'])['Extent'].mean().reset_index()
-        
-        # Calculate trends for each month
-        trends = []
-        for month in range(1, 13):
-            month_data = monthly_avg[monthly_avg['Month'] == month]
-            
-            if len(month_data) > 1:  # Need at least 2 points for trend
-                # Simple linear regression
-                X = month_data['Year'].values.reshape(-1, 1)
-                y = month_data['Extent'].values
-                
-                # Calculate trend (slope)
-                slope = np.polyfit(X.flatten(), y, 1)[0]
-                
-                trends.append({
-                    'Month': month,
-                    'Trend': slope
-                })
-        
-        trends_df = pd.DataFrame(trends)
+
+        # One least-squares fit per calendar month, all months at once
+        trends_df = (grouped_trends(monthly_avg, 'Year', 'Extent', by='Month')
+                     .dropna(subset=['slope'])
+                     .rename(columns={'slope': 'Trend'})
+                     .reset_index(drop=True))
         logger.info(f"Calculated trends for {len(trends_df)} months")
         return monthly_avg, trends_df
     except Exception as e:
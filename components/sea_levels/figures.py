@@ -0,0 +1,226 @@
+"""The five sea-level and sea-ice figures of the /sea page.
+
+None of them depends on user input, so each is built once per data version
+from the persisted derived products in :mod:`.data` (seasonal cycle, monthly
+means, smoothed extent series with its trend, annual extremes) and stored on
+disk with :func:`components.figure_cache.stored_figure`. Page visits are
+served from the in-process cache of :func:`get_sea_level_figures`; a changed
+``Global_sea_level_rise.csv`` or ``seaice.csv`` changes :func:`data_version`
+and triggers a rebuild.
+
+The daily extent traces are downsampled to a point budget, and a zoom on
+the extent chart re-samples the visible window (:func:`extent_patch`).
+"""
+import logging
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from dash import Patch
+
+from components.cache import cached
+from components.downsample import downsample_frame
+from components.figure_cache import stored_figure
+from .data import (data_version, load_annual_extremes, load_extent_series, load_extent_trend, load_monthly_extent,
+                   load_seasonal_cycle, load_sea_ice_data, load_sea_level_data)
+
+logger = logging.getLogger(__name__)
+
+# Bump when a builder changes so figures stored for the same data are rebuilt
+FIGURES_VERSION = 3
+FIGURE_NAMES = ['sea_level_scatter', 'sea_level_area', 'sea_ice_seasonal', 'sea_ice_trends', 'sea_ice_extent']
+
+
+def create_empty_figure(title="No data available"):
+    """Create an empty figure with a message."""
+    fig = go.Figure()
+    fig.add_annotation(
+        text=title,
+        xref="paper",
+        yref="paper",
+        x=0.5,
+        y=0.5,
+        showarrow=False,
+        font=dict(size=20)
+    )
+    fig.update_layout(
+        xaxis=dict(showgrid=False, showticklabels=False),
+        yaxis=dict(showgrid=False, showticklabels=False)
+    )
+    return fig
+
+
+def build_scatter_figure():
+    return px.scatter(load_sea_level_data(), x='Year', y='Sea Level', title='Sea Level Change Over Time')
+
+
+def build_area_figure():
+    return px.area(load_sea_level_data(), x='Year', y='Sea Level', title='Cumulative Sea Level Change')
+
+
+def build_seasonal_figure():
+    seasonal_data = load_seasonal_cycle()
+    fig_seasonal = go.Figure()
+
+    # Add standard deviation bands
+    fig_seasonal.add_trace(go.Scatter(
+        x=seasonal_data['DayOfYear'],
+        y=seasonal_data['Mean_Extent'] + seasonal_data['Std_Extent'],
+        mode='lines',
+        line=dict(width=0),
+        showlegend=False,
+        name='Upper Bound'
+    ))
+    fig_seasonal.add_trace(go.Scatter(
+        x=seasonal_data['DayOfYear'],
+        y=seasonal_data['Mean_Extent'] - seasonal_data['Std_Extent'],
+        mode='lines',
+        line=dict(width=0),
+        fillcolor='rgba(0, 114, 178, 0.2)',
+        fill='tonexty',
+        showlegend=False,
+        name='Lower Bound'
+    ))
+
+    # Add smoothed mean line
+    fig_seasonal.add_trace(go.Scatter(
+        x=seasonal_data['DayOfYear'],
+        y=seasonal_data['Smoothed_Mean_Extent'],
+        mode='lines',
+        line=dict(color='#0072B2', width=3),
+        name='7-Day Rolling Mean'
+    ))
+
+    # Find and label min/max points
+    min_day = seasonal_data.loc[seasonal_data['Mean_Extent'].idxmin()]
+    max_day = seasonal_data.loc[seasonal_data['Mean_Extent'].idxmax()]
+
+    fig_seasonal.add_trace(go.Scatter(
+        x=[min_day['DayOfYear'], max_day['DayOfYear']],
+        y=[min_day['Mean_Extent'], max_day['Mean_Extent']],
+        mode='markers+text',
+        marker=dict(color='red', size=8),
+        text=[f"Min: Day {int(min_day['DayOfYear'])}", f"Max: Day {int(max_day['DayOfYear'])}"],
+        textposition="top center",
+        showlegend=False
+    ))
+
+    fig_seasonal.update_layout(
+        title='Average Sea Ice Extent by Day of Year',
+        yaxis_title='Sea-ice extent (million km²)',
+        xaxis_title='Day of Year',
+        hovermode='x unified'
+    )
+    return fig_seasonal
+
+
+def build_trends_figure():
+    # Heatmap of the monthly mean extent
+    pivot_data = load_monthly_extent().pivot(index='Month', columns='Year', values='Extent')
+    return px.imshow(
+        pivot_data,
+        labels=dict(x="Year", y="Month", color="Sea Ice Extent (million km²)"),
+        title='Monthly Sea Ice Extent Heatmap',
+        color_continuous_scale=px.colors.sequential.Plasma
+    )
+
+
+def extent_traces(x_range=None):
+    """x/y of the band, rolling mean and trend traces of the extent figure.
+
+    The daily series is downsampled to the point budget, over ``x_range``
+    only when given (see :mod:`components.downsample`).
+    """
+    series = downsample_frame(load_extent_series(), 'Date', 'Extent_smoothed', x_range=x_range)
+    upper = series['Extent_smoothed'] + series['Extent_std']
+    lower = series['Extent_smoothed'] - series['Extent_std']
+    x = series['Date']
+    return [(x, upper), (x, lower), (x, series['Extent_smoothed']), (x, series['Trend'])]
+
+
+def extent_patch(x_range):
+    """Patch that replaces the downsampled traces of the extent figure for ``x_range``."""
+    patch = Patch()
+    for i, (x, y) in enumerate(extent_traces(x_range)):
+        patch['data'][i]['x'] = x.to_numpy()
+        patch['data'][i]['y'] = y.to_numpy()
+    return patch
+
+
+def build_extent_figure():
+    (x_upper, upper), (x_lower, lower), (x_mean, smoothed), (x_trend, trend) = extent_traces()
+    extremes = load_annual_extremes()
+    annual_mins = extremes[extremes['Kind'] == 'min']
+    annual_maxs = extremes[extremes['Kind'] == 'max']
+
+    fig_extent = go.Figure()
+
+    # Add shaded variability band
+    fig_extent.add_trace(go.Scatter(
+        x=x_upper, y=upper,
+        mode='lines', line=dict(width=0), showlegend=False, name='Upper Bound'
+    ))
+    fig_extent.add_trace(go.Scatter(
+        x=x_lower, y=lower,
+        mode='lines', line=dict(width=0), fillcolor='rgba(0, 114, 178, 0.2)', fill='tonexty',
+        showlegend=True, name='±1 Std. Dev.'
+    ))
+    # Add smoothed line
+    fig_extent.add_trace(go.Scatter(
+        x=x_mean, y=smoothed,
+        mode='lines', line=dict(color='#0072B2', width=2), name='30-Day Rolling Mean'
+    ))
+    # Add trend line
+    fig_extent.add_trace(go.Scatter(
+        x=x_trend, y=trend,
+        mode='lines', line=dict(color='red', dash='dash', width=2), name='Long-term Trend'
+    ))
+    # Add annual min/max markers
+    fig_extent.add_trace(go.Scatter(
+        x=annual_mins['Date'], y=annual_mins['Extent'], mode='markers',
+        marker=dict(color='blue', size=5, symbol='diamond'), name='Annual Minimum'
+    ))
+    fig_extent.add_trace(go.Scatter(
+        x=annual_maxs['Date'], y=annual_maxs['Extent'], mode='markers',
+        marker=dict(color='red', size=5, symbol='circle'), name='Annual Maximum'
+    ))
+
+    fig_extent.update_layout(
+        title='Trends in Sea Ice Extent Over Years',
+        yaxis_title='Sea Ice Extent (million km²)',
+        xaxis_title='Year', hovermode='x unified', legend=dict(x=0.01, y=0.99),
+        # Keep the zoom when the traces are re-densified
+        uirevision='extent'
+    )
+    # Fix negative zero for trend annotation
+    fit = load_extent_trend().iloc[0]
+    trend_val = fit['slope'] * 10
+    if np.isclose(trend_val, 0, atol=1e-2):
+        trend_val = 0.00
+    margin = (fit['slope_high'] - fit['slope']) * 10
+    text = f'Trend: {trend_val:.2f} million km²/decade'
+    if np.isfinite(margin):
+        text = f'Trend: {trend_val:.2f} ± {margin:.2f} million km²/decade (95% CI)'
+    fig_extent.add_annotation(
+        x=0.99, y=0.99, xref='paper', yref='paper', text=text,
+        showarrow=False, font=dict(size=12, color="red"), align="right"
+    )
+    return fig_extent
+
+
+BUILDERS = dict(zip(FIGURE_NAMES, [build_scatter_figure, build_area_figure, build_seasonal_figure,
+                                   build_trends_figure, build_extent_figure]))
+
+
+@cached(version=data_version)
+def get_sea_level_figures():
+    """Return the five /sea figures as dicts, built once per data version.
+
+    Returns empty placeholder figures (not stored) when either dataset could
+    not be loaded.
+    """
+    if load_sea_level_data().empty or load_sea_ice_data().empty:
+        logger.warning("Sea level or sea ice data unavailable, serving empty figures")
+        return tuple(create_empty_figure().to_dict() for _ in FIGURE_NAMES)
+    version = f'{data_version()}.{FIGURES_VERSION}'
+    return tuple(stored_figure(name, version, build) for name, build in BUILDERS.items())
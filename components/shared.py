@@ -0,0 +1,154 @@
+"""Read-only DataFrames that forked workers can share.
+
+Loaders return their cached frames through :func:`freeze_frame`. A frozen
+frame is an ordinary DataFrame for reading. Its column buffers are marked
+read-only, and adding, replacing or deleting columns, assigning through
+``loc``/``iloc``/``at``/``iat`` or any ``inplace=True`` operation raises
+:class:`SharedDataError`. Anything derived from it (a filter, ``assign``,
+``copy``, a groupby result) is a normal, writable DataFrame, so callbacks
+build on the cached data without changing it for the next request.
+
+In shared mode (``CLIMATE_SHARED_FRAMES=1``, set by ``gunicorn.conf.py``) the
+datasets are loaded in the master process before it forks. Text columns are
+also moved into Arrow string buffers there. Python ``str`` objects would have
+their reference counts written on every access, and that write makes each
+worker copy the page. Arrow string buffers are never written, so the pages
+stay shared.
+"""
+import functools
+import inspect
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.core.indexing import _AtIndexer, _iAtIndexer, _iLocIndexer, _LocIndexer
+
+try:
+    import pyarrow  # noqa: F401  (needed by the Arrow string dtype)
+except ImportError:
+    pyarrow = None
+
+
+class SharedDataError(RuntimeError):
+    """Raised when code tries to modify a DataFrame shared between requests and workers."""
+
+
+def shared_mode():
+    """Whether frames are being prepared for sharing across forked workers."""
+    return os.environ.get('CLIMATE_SHARED_FRAMES', '0') == '1'
+
+
+def _refuse(what):
+    raise SharedDataError(f"Cannot {what} a shared read-only DataFrame; "
+                          f"work on a copy (e.g. df.assign(...) or df.copy())")
+
+
+def _read_only_indexer(base):
+    class ReadOnlyIndexer(base):
+        def __setitem__(self, key, value):
+            _refuse(f'assign through .{self.name} on')
+    ReadOnlyIndexer.__name__ = f'ReadOnly{base.__name__}'
+    return ReadOnlyIndexer
+
+
+_ReadOnlyLoc = _read_only_indexer(_LocIndexer)
+_ReadOnlyILoc = _read_only_indexer(_iLocIndexer)
+_ReadOnlyAt = _read_only_indexer(_AtIndexer)
+_ReadOnlyIAt = _read_only_indexer(_iAtIndexer)
+
+
+class FrozenFrame(pd.DataFrame):
+    """A DataFrame whose columns and values cannot be modified."""
+
+    @property
+    def _constructor(self):
+        # Results of operations on a frozen frame are ordinary frames
+        return pd.DataFrame
+
+    @property
+    def loc(self):
+        return _ReadOnlyLoc('loc', self)
+
+    @property
+    def iloc(self):
+        return _ReadOnlyILoc('iloc', self)
+
+    @property
+    def at(self):
+        return _ReadOnlyAt('at', self)
+
+    @property
+    def iat(self):
+        return _ReadOnlyIAt('iat', self)
+
+    def __setitem__(self, key, value):
+        _refuse('set columns on')
+
+    def __delitem__(self, key):
+        _refuse('delete columns from')
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen') and (name in ('index', 'columns') or
+                                             (not name.startswith('_') and name in self.columns)):
+            _refuse(f'set {name!r} on')
+        super().__setattr__(name, value)
+
+    def insert(self, *args, **kwargs):
+        _refuse('insert columns into')
+
+    def pop(self, *args, **kwargs):
+        _refuse('pop columns from')
+
+    def update(self, *args, **kwargs):
+        _refuse('update')
+
+    def _update_inplace(self, *args, **kwargs):
+        _refuse('modify in place')
+
+
+def _refuse_inplace(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if kwargs.get('inplace'):
+            _refuse(f'call {method.__name__}(inplace=True) on')
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+# Some inplace operations write into the blocks before _update_inplace runs
+for _name, _method in inspect.getmembers(pd.DataFrame, inspect.isfunction):
+    if 'inplace' in inspect.signature(_method).parameters:
+        setattr(FrozenFrame, _name, _refuse_inplace(_method))
+
+
+def _shared_string_dtype():
+    if pyarrow is None:
+        return None
+    try:
+        return pd.StringDtype('pyarrow', na_value=np.nan)  # pandas >= 2.3
+    except TypeError:
+        try:
+            return pd.StringDtype('pyarrow_numpy')  # pandas 2.1 - 2.2
+        except (TypeError, ValueError):
+            return None
+
+
+def freeze_frame(df):
+    """Return ``df`` as a :class:`FrozenFrame` over the same (now read-only) buffers."""
+    if isinstance(df, FrozenFrame) or not isinstance(df, pd.DataFrame):
+        return df
+
+    if shared_mode():
+        string_dtype = _shared_string_dtype()
+        if string_dtype is not None:
+            text = [c for c in df.columns
+                    if df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True) == 'string']
+            if text:
+                df = df.astype({c: string_dtype for c in text})
+
+    frozen = FrozenFrame(df, copy=False)
+    for block in frozen._mgr.blocks:
+        if isinstance(block.values, np.ndarray):
+            block.values.flags.writeable = False
+    object.__setattr__(frozen, '_frozen', True)
+    return frozen
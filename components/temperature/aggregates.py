@@ -0,0 +1,83 @@
+"""Country temperature cube shared by the global choropleth and the globe.
+
+``GlobalLandTemperaturesByCountry`` is reduced once, in a single grouped pass,
+to a country x year x month cube holding the sum and count of the monthly
+averages. The cube is persisted with :func:`cached_frame`, and every coarser
+view (country x year for the animated choropleth, one value per country for
+the globe) is rolled up from it instead of from the raw rows. Keeping sums and
+counts rather than means makes those roll-ups exact. Per-country warming
+rates are fitted on the yearly roll-up in one batched call.
+"""
+from functools import lru_cache
+
+import pandas as pd
+
+from components.frame_cache import cached_frame
+from components.shared import freeze_frame
+from components.trends import grouped_trends
+from .data import load_global_temps_by_country
+
+SOURCE = 'dataset/GlobalLandTemperaturesByCountry.csv'
+
+# Continents and the mainland-plus-territories variants of a few countries;
+# the '(Europe)' rows are the mainland figures the map should show
+EXCLUDED_COUNTRIES = ['Denmark', 'Antarctica', 'France', 'Europe', 'Netherlands',
+                      'United Kingdom', 'Africa', 'South America']
+COUNTRY_RENAMES = {
+    'Denmark (Europe)': 'Denmark',
+    'France (Europe)': 'France',
+    'Netherlands (Europe)': 'Netherlands',
+    'United Kingdom (Europe)': 'United Kingdom',
+}
+
+
+def _build_cube():
+    df = load_global_temps_by_country()
+    df = df[df['AverageTemperature'].notna() & ~df['Country'].isin(EXCLUDED_COUNTRIES)]
+    dates = pd.to_datetime(df['dt'])
+    country = df['Country'].replace(COUNTRY_RENAMES)
+    cube = (df.groupby([country.rename('Country'), dates.dt.year.rename('Year'), dates.dt.month.rename('Month')])
+              ['AverageTemperature'].agg(['sum', 'count']))
+    cube.columns = ['TempSum', 'TempCount']
+    return cube.reset_index()
+
+
+@lru_cache(maxsize=1)
+def load_temperature_cube():
+    """Return the country x year x month cube (``TempSum``, ``TempCount``)."""
+    return cached_frame('temperature_cube', [SOURCE], _build_cube)
+
+
+def _rollup(keys):
+    cube = load_temperature_cube()
+    out = cube.groupby(keys, as_index=False, sort=True)[['TempSum', 'TempCount']].sum()
+    out['AverageTemperature'] = out['TempSum'] / out['TempCount']
+    return freeze_frame(out.drop(columns=['TempSum', 'TempCount']))
+
+
+@lru_cache(maxsize=1)
+def country_year_means():
+    """Mean temperature per country and year, sorted by country then year."""
+    return _rollup(['Country', 'Year'])
+
+
+@lru_cache(maxsize=1)
+def country_means():
+    """Mean temperature per country over its whole record."""
+    return _rollup(['Country'])
+
+
+@lru_cache(maxsize=4)
+def country_warming_rates(since=None):
+    """Linear warming rate per country in °C per decade (``slope`` and its interval).
+
+    Only years from ``since`` on are used when given. Returns ``Country``
+    followed by the columns of :func:`components.trends.grouped_trends`, with
+    the slope, interval and standard error scaled to decades.
+    """
+    df = country_year_means()
+    if since is not None:
+        df = df[df['Year'] >= since]
+    rates = grouped_trends(df, 'Year', 'AverageTemperature', by='Country')
+    per_decade = ['slope', 'stderr', 'slope_low', 'slope_high']
+    return freeze_frame(rates.assign(**{c: rates[c] * 10 for c in per_decade}))
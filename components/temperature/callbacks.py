@@ -1,24 +1,67 @@
-from dash import Input, Output
+from dash import Input, Output, State
 import plotly.graph_objects as go
 import pandas as pd
 import plotly.express as px
+from functools import partial
 
-from .data import load_temps_by_city
-from .layout import fig11, fig21, fig31, fig41, fig51, fig61
+from components.figure_cache import figure_cache
+from .frames import get_frame_index
+from .layout import COUNTRY_OPTIONS, build_heatmap_frame, get_country_figure
 
 def register_temperature_callbacks(app):
-    @app.callback(Output('choropleth-map11', 'figure'),
-                  [Input('choro-dropdown', 'value')])
-    def update_choro(value):
-        if value == 'fig11':
-            return fig11
-        elif value == 'fig21':
-            return fig21
-        elif value == 'fig31':
-            return fig31
-        elif value == 'fig41':
-            return fig41
-        elif value == 'fig51':
-            return fig51
-        elif value == 'fig61':
-            return fig61
+    # The country maps are static, so they are serialized once and fetched by
+    # the browser from the figure cache (ETag revalidation) instead of being
+    # re-encoded by a server-side callback on every dropdown change.
+    for option in COUNTRY_OPTIONS:
+        figure_cache.register('temperature', option['value'], partial(get_country_figure, option['value']))
+
+    app.clientside_callback(
+        """
+        function(value) {
+            if (!value) {
+                return window.dash_clientside.no_update;
+            }
+            return fetch('%s' + encodeURIComponent(value)).then(function(response) {
+                if (!response.ok) {
+                    throw new Error('Could not load figure ' + value);
+                }
+                return response.json();
+            });
+        }
+        """ % figure_cache.url(app, 'temperature'),
+        Output('choropleth-map11', 'figure'),
+        Input('choro-dropdown', 'value')
+    )
+
+    # City heatmap: one frame per request, selected with the slider
+    @app.callback(Output('heat-frame-slider', 'max'),
+                  Output('heat-frame-slider', 'marks'),
+                  Output('heat-frame-slider', 'value'),
+                  Input('heat-granularity', 'value'))
+    def update_heat_slider(granularity):
+        index = get_frame_index(granularity)
+        last = max(len(index) - 1, 0)
+        step = max(len(index) // 10, 1)
+        marks = {i: str(index.labels[i]) for i in range(0, len(index), step)}
+        return last, marks, last
+
+    @app.callback(Output('heatmap', 'figure'),
+                  Input('heat-frame-slider', 'value'),
+                  Input('heat-granularity', 'value'))
+    def update_heatmap(position, granularity):
+        return build_heatmap_frame(granularity, position or 0)
+
+    @app.callback(Output('heat-interval', 'disabled'),
+                  Output('heat-play', 'children'),
+                  Input('heat-play', 'n_clicks'))
+    def toggle_heat_play(n_clicks):
+        playing = bool(n_clicks) and n_clicks % 2 == 1
+        return not playing, 'Pause' if playing else 'Play'
+
+    @app.callback(Output('heat-frame-slider', 'value', allow_duplicate=True),
+                  Input('heat-interval', 'n_intervals'),
+                  State('heat-frame-slider', 'value'),
+                  State('heat-frame-slider', 'max'),
+                  prevent_initial_call=True)
+    def advance_heat_frame(_, position, last):
+        return 0 if (position or 0) >= (last or 0) else position + 1
@@ -1,35 +1,38 @@
 import pandas as pd
 import json
 import numpy as np
+import os
+
+from components.frame_cache import cached_frame
 
 def load_geojson(file_path):
     with open(file_path, "r") as f:
         return json.load(f)
 
 def load_temperatures_by_country(file_path):
-    return pd.read_csv(file_path)
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return cached_frame(name, [file_path], lambda: pd.read_csv(file_path))
 
 def load_major_city_temps():
-    df = pd.read_csv('dataset/UpdatedMajorCity_temperatures.csv')
-    df['Date'] = pd.to_datetime(df['dt'])
-    df['Year'] = df['Date'].dt.year
-    df['Month'] = df['Date'].dt.month
-    df['Day'] = df['Date'].dt.day
-    return df
-
-def load_temps_by_city():
-    return pd.read_csv("dataset/GlobalLandTemperaturesByCity.csv")
+    def build():
+        df = pd.read_csv('dataset/UpdatedMajorCity_temperatures.csv')
+        df['Date'] = pd.to_datetime(df['dt'])
+        df['Year'] = df['Date'].dt.year
+        df['Month'] = df['Date'].dt.month
+        df['Day'] = df['Date'].dt.day
+        return df
+    return cached_frame('major_city_temps', ['dataset/UpdatedMajorCity_temperatures.csv'], build)
 
 def load_continent_map():
-    continent_map = pd.read_csv("dataset/continents2.csv.xls")
-    continent_map.rename(columns={'name': 'Country', 'region': 'Region'}, inplace=True)
-    return continent_map
+    def build():
+        continent_map = pd.read_csv("dataset/continents2.csv.xls")
+        continent_map.rename(columns={'name': 'Country', 'region': 'Region'}, inplace=True)
+        return continent_map
+    return cached_frame('continent_map', ['dataset/continents2.csv.xls'], build)
 
 def load_global_temps_by_country():
-    return pd.read_csv('dataset/GlobalLandTemperaturesByCountry.csv')
-
-def load_global_temps_by_country_v2():
-    return pd.read_csv('dataset/GlobalLandTemperaturesByCountry-2.csv')
+    return cached_frame('global_temps_by_country', ['dataset/GlobalLandTemperaturesByCountry.csv'],
+                        lambda: pd.read_csv('dataset/GlobalLandTemperaturesByCountry.csv'))
 
 def load_avg_dataset():
-    return pd.read_csv('dataset/avg_dataset.csv')
+    return cached_frame('avg_dataset', ['dataset/avg_dataset.csv'], lambda: pd.read_csv('dataset/avg_dataset.csv'))
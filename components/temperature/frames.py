@@ -0,0 +1,58 @@
+"""Per-period frame index for the city temperature heatmap.
+
+Instead of shipping every month of ``UpdatedMajorCity_temperatures`` as one
+animated figure, the heatmap shows a single period and fetches the next one
+from a :class:`FrameIndex` when the slider moves. The index sorts the rows by
+period once and keeps the offset where each period starts, so fetching a
+frame is a slice, not a filter over the whole history.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from components.shared import freeze_frame
+from .data import load_major_city_temps
+
+# Slider granularities; yearly and decadal frames average each city's months
+GRANULARITIES = {
+    'month': 'Monthly',
+    'year': 'Yearly',
+    'decade': 'Decadal',
+}
+
+
+class FrameIndex:
+    """City temperatures grouped into contiguous per-period slices."""
+
+    def __init__(self, df, granularity='month'):
+        df = df.dropna(subset=['AverageTemperature', 'Latitude_Float', 'Longitude_Float'])
+        if granularity == 'month':
+            df = df.assign(period=df['Date'].dt.to_period('M').astype(str))
+        else:
+            period = df['Year'] if granularity == 'year' else df['Year'] // 10 * 10
+            df = df.assign(period=period.astype(str) + ('s' if granularity == 'decade' else ''))
+            df = (df.groupby(['period', 'City'], as_index=False, sort=False)
+                    .agg(AverageTemperature=('AverageTemperature', 'mean'),
+                         Latitude_Float=('Latitude_Float', 'first'),
+                         Longitude_Float=('Longitude_Float', 'first')))
+
+        df = df[['period', 'City', 'Latitude_Float', 'Longitude_Float', 'AverageTemperature']]
+        self.df = freeze_frame(df.sort_values('period', kind='stable').reset_index(drop=True))
+        self.labels, starts = np.unique(self.df['period'].to_numpy(), return_index=True)
+        self.offsets = np.append(starts, len(self.df))
+        # One colour scale for every frame so periods are comparable
+        self.zmin = float(self.df['AverageTemperature'].min()) if len(self.df) else 0.0
+        self.zmax = float(self.df['AverageTemperature'].max()) if len(self.df) else 0.0
+
+    def __len__(self):
+        return len(self.labels)
+
+    def frame(self, position):
+        """Return the rows of the ``position``-th period."""
+        position = min(max(int(position), 0), len(self.labels) - 1)
+        return self.df.iloc[self.offsets[position]:self.offsets[position + 1]]
+
+
+@lru_cache(maxsize=len(GRANULARITIES))
+def get_frame_index(granularity):
+    return FrameIndex(load_major_city_temps(), granularity)
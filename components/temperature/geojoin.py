@@ -0,0 +1,60 @@
+"""Join region names in a DataFrame to the feature ids of a geojson.
+
+Every state-level map goes through :class:`GeoIndex`: it reads the name and id
+of each feature once, and :meth:`GeoIndex.join` maps a whole column of names
+in one pass over its unique values instead of a per-row ``apply``. Names are
+compared after normalization (accents, case, ``&`` vs ``and``, punctuation),
+and ``aliases`` cover names that differ between the data and the boundaries.
+"""
+import logging
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_name(name):
+    """Return a comparison key for a region name, e.g. 'Québec' -> 'quebec'."""
+    if not isinstance(name, str):
+        return None
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    name = name.casefold().replace('&', ' and ')
+    return re.sub(r'[^a-z0-9]+', ' ', name).strip()
+
+
+class GeoIndex:
+    """Name -> feature id index for one geojson FeatureCollection.
+
+    ``id_property`` names the feature property holding the id; when it is None
+    the feature's own ``id`` is used. The chosen id is written back to
+    ``feature['id']`` so Plotly can match ``locations`` against it.
+    """
+
+    def __init__(self, geojson, name_property, id_property=None, aliases=None):
+        self.geojson = geojson
+        self._index = {}
+        for feature in geojson['features']:
+            if id_property is not None:
+                feature['id'] = feature['properties'][id_property]
+            self._index[normalize_name(feature['properties'][name_property])] = feature['id']
+        for alias, name in (aliases or {}).items():
+            self._index[normalize_name(alias)] = self._index.get(normalize_name(name))
+        self.unmatched = []
+
+    def lookup(self, name):
+        return self._index.get(normalize_name(name))
+
+    def join(self, names, label=None):
+        """Return a Series of feature ids aligned with ``names`` (None where unmatched)."""
+        codes, uniques = pd.factorize(names)
+        ids = np.array([self._index.get(normalize_name(name)) for name in uniques] + [None], dtype=object)
+        # factorize marks missing names with -1, which picks the trailing None
+        result = pd.Series(ids[codes], index=names.index, name='id')
+
+        self.unmatched = sorted(str(name) for name, feature_id in zip(uniques, ids) if feature_id is None)
+        if self.unmatched:
+            logger.warning(f"{label or 'geo join'}: no boundary for {len(self.unmatched)} name(s): {', '.join(self.unmatched)}")
+        return result
@@ -0,0 +1,232 @@
+"""Level-of-detail geojson for the state choropleths.
+
+The raw boundary files carry far more vertices than a map at country zoom can
+show. :func:`load_simplified_geojson` returns a copy simplified for the zoom a
+figure opens at, using one of a few fixed tolerance levels, and caches each
+level on disk next to the frame cache.
+
+Simplification preserves topology: rings are split into arcs at the points
+where neighbouring states meet, and every arc is simplified once (Douglas-
+Peucker) and reused by every ring that shares it, so borders between states
+stay gap free. Coordinates are quantized to the precision the level needs,
+which also shortens the serialized numbers.
+
+Run ``python -m components.temperature.geometry <file> ...`` to prebuild all
+levels for some files.
+"""
+import json
+import logging
+import math
+import os
+import sys
+
+import numpy as np
+
+from components.frame_cache import CACHE_DIR, source_version
+
+logger = logging.getLogger(__name__)
+
+GEOJSON_CACHE_DIR = os.path.join(CACHE_DIR, 'geojson')
+
+# Simplification tolerances in degrees, finest first
+LOD_TOLERANCES = (0.002, 0.005, 0.01, 0.02, 0.05, 0.1)
+
+# Grid used to match shared vertices between neighbouring rings (~1 m)
+_SNAP = 1e-5
+
+
+def tolerance_for_zoom(zoom, pixels=1.0):
+    """Return the coarsest level whose error stays under ``pixels`` at ``zoom``.
+
+    Mapbox GL renders 512 px tiles, so one pixel spans ``360 / (512 * 2**zoom)``
+    degrees of longitude at the initial view.
+    """
+    max_error = pixels * 360.0 / (512 * 2 ** zoom)
+    levels = [t for t in LOD_TOLERANCES if t <= max_error]
+    return levels[-1] if levels else None
+
+
+def load_simplified_geojson(file_path, zoom):
+    """Load ``file_path`` simplified for a map opened at ``zoom`` (cached on disk)."""
+    tolerance = tolerance_for_zoom(zoom)
+    if tolerance is None:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    cache_path = os.path.join(GEOJSON_CACHE_DIR, f'{name}-{tolerance:g}-{source_version(file_path)}.json')
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+
+    with open(file_path, 'r') as f:
+        geojson = json.load(f)
+    simplified = simplify_geojson(geojson, tolerance)
+    try:
+        os.makedirs(GEOJSON_CACHE_DIR, exist_ok=True)
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(simplified, f, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not cache simplified geojson {cache_path}: {e}")
+    return simplified
+
+
+def simplify_geojson(geojson, tolerance):
+    """Return a topology-preserving simplification of a FeatureCollection."""
+    decimals = max(0, math.ceil(-math.log10(tolerance)))
+
+    # Snap every ring to the shared grid so identical vertices compare equal
+    features = []
+    rings = []
+    for feature in geojson['features']:
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') == 'Polygon':
+            polygons = [_snap_polygon(geometry['coordinates'])]
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons = [_snap_polygon(p) for p in geometry['coordinates']]
+        else:
+            polygons = None
+        if polygons is not None:
+            for polygon in polygons:
+                rings.extend(polygon)
+        features.append((feature, polygons))
+
+    junctions = _find_junctions(rings)
+    arc_cache = {}
+    step = tolerance / _SNAP
+
+    out_features = []
+    for feature, polygons in features:
+        if polygons is None:
+            out_features.append(feature)
+            continue
+        kept = []
+        for polygon in polygons:
+            exterior = _simplify_ring(polygon[0], junctions, step, arc_cache)
+            if exterior is None:
+                continue
+            holes = [h for h in (_simplify_ring(r, junctions, step, arc_cache) for r in polygon[1:]) if h is not None]
+            kept.append([exterior] + holes)
+        if not kept:
+            # Never drop a whole feature: keep its largest polygon unsimplified
+            kept = [max(polygons, key=lambda p: len(p[0]))]
+        coordinates = [[_unsnap(ring, decimals) for ring in polygon] for polygon in kept]
+        if feature['geometry']['type'] == 'Polygon':
+            geometry = {'type': 'Polygon', 'coordinates': coordinates[0]}
+        else:
+            geometry = {'type': 'MultiPolygon', 'coordinates': coordinates}
+        out_features.append({**feature, 'geometry': geometry})
+
+    return {**geojson, 'features': out_features}
+
+
+def _snap_polygon(polygon):
+    rings = []
+    for ring in polygon:
+        points = [(int(round(x / _SNAP)), int(round(y / _SNAP))) for x, y, *_ in ring]
+        # Drop consecutive duplicates created by snapping
+        points = [p for i, p in enumerate(points) if i == 0 or p != points[i - 1]]
+        if points[0] != points[-1]:
+            points.append(points[0])
+        rings.append(points)
+    return rings
+
+
+def _unsnap(ring, decimals):
+    return [[round(x * _SNAP, decimals), round(y * _SNAP, decimals)] for x, y in ring]
+
+
+def _find_junctions(rings):
+    """Return the points where a shared border starts or ends.
+
+    A point is a junction when the rings passing through it do not all
+    continue to the same pair of neighbours.
+    """
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring) - 1  # closed ring, last point repeats the first
+        for i in range(n):
+            point = ring[i]
+            pair = frozenset((ring[i - 1] if i else ring[n - 1], ring[i + 1]))
+            seen = neighbours.get(point)
+            if seen is None:
+                neighbours[point] = pair
+            elif seen != pair:
+                junctions.add(point)
+    return junctions
+
+
+def _simplify_ring(ring, junctions, step, arc_cache):
+    """Simplify one closed ring arc by arc; return None if it collapses."""
+    if len(ring) < 4:
+        return None
+    points = ring[:-1]
+    cuts = [i for i, p in enumerate(points) if p in junctions]
+    if not cuts:
+        # Isolated ring: start from its smallest point so every ring with the
+        # same geometry (e.g. an enclave and its hole) is cut identically
+        cuts = [points.index(min(points))]
+
+    out = []
+    for k, start in enumerate(cuts):
+        end = cuts[k + 1] if k + 1 < len(cuts) else cuts[0] + len(points)
+        arc = [points[i % len(points)] for i in range(start, end + 1)]
+        out.extend(_simplify_arc(arc, step, arc_cache)[:-1])
+    out.append(out[0])
+    return out if len(out) >= 4 else None
+
+
+def _simplify_arc(arc, step, arc_cache):
+    """Douglas-Peucker on one arc, memoized by its direction-independent key."""
+    reverse = arc[-1] < arc[0] or (arc[-1] == arc[0] and len(arc) > 2 and arc[-2] < arc[1])
+    canonical = tuple(reversed(arc)) if reverse else tuple(arc)
+    simplified = arc_cache.get(canonical)
+    if simplified is None:
+        simplified = _douglas_peucker(canonical, step)
+        arc_cache[canonical] = simplified
+    return simplified[::-1] if reverse else simplified
+
+
+def _douglas_peucker(points, tolerance):
+    pts = np.asarray(points, dtype=float)
+    if len(pts) < 3:
+        return [tuple(p) for p in points]
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = pts[end] - pts[start]
+        offsets = pts[start + 1:end] - pts[start]
+        length = math.hypot(segment[0], segment[1])
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return [points[i] for i in np.flatnonzero(keep)]
+
+
+def preprocess(paths):
+    """Build and cache every level of detail for ``paths``."""
+    for path in paths:
+        for tolerance in LOD_TOLERANCES:
+            # Zoom at which one pixel equals this tolerance (nudged so it selects it)
+            zoom = math.log2(360.0 / (512 * tolerance)) - 1e-6
+            geojson = load_simplified_geojson(path, zoom)
+            logger.info(f"{path} @ {tolerance:g} deg: {len(json.dumps(geojson, separators=(',', ':'))) / 1e3:.0f} kB")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    preprocess(sys.argv[1:])
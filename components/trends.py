@@ -0,0 +1,93 @@
+"""Least-squares linear trends for many groups in one vectorized pass.
+
+:func:`grouped_trends` fits ``y = slope * x + intercept`` separately for
+every group of a frame without a Python loop over groups. Rows are assigned
+integer group codes, and the per-group sums the closed-form OLS solution
+needs are accumulated with ``np.bincount``. ``x`` and ``y`` are centred on
+their group means before the second-order sums are taken, so years around
+2000 do not cost precision. Each group gets its slope, intercept, the
+standard error of the slope, a confidence interval for it, r² and the number
+of points used.
+
+The sea-ice monthly and long-term trends, the temperature warming rates and
+the per-country GHG trends all go through here.
+"""
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+TREND_COLUMNS = ['slope', 'intercept', 'stderr', 'slope_low', 'slope_high', 'r2', 'n']
+
+
+def t_quantile(p, df):
+    """Quantile ``p`` of Student's t with ``df`` degrees of freedom (array-friendly).
+
+    Uses the Cornish-Fisher expansion around the normal quantile, which is
+    within 1% of the exact value from 3 degrees of freedom up; fewer give NaN.
+    """
+    z = NormalDist().inv_cdf(p)
+    df = np.asarray(df, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (z + (z ** 3 + z) / (4 * df)
+             + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+             + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3)
+             + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / (92160 * df ** 4))
+    return np.where(df >= 3, t, np.nan)
+
+
+def _fit(codes, x, y, n_groups, confidence):
+    """OLS per group code; returns a dict of arrays indexed by code."""
+    n = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.bincount(codes, x, n_groups) / n
+        y_mean = np.bincount(codes, y, n_groups) / n
+        dx = x - x_mean[codes]
+        dy = y - y_mean[codes]
+        sxx = np.bincount(codes, dx * dx, n_groups)
+        sxy = np.bincount(codes, dx * dy, n_groups)
+        syy = np.bincount(codes, dy * dy, n_groups)
+
+        fitted = (n >= 2) & (sxx > 0)
+        slope = np.where(fitted, sxy / sxx, np.nan)
+        intercept = y_mean - slope * x_mean
+        residual = np.maximum(syy - slope * sxy, 0.0)
+        stderr = np.where(fitted & (n > 2), np.sqrt(residual / (n - 2) / sxx), np.nan)
+        r2 = np.where(fitted & (syy > 0), 1.0 - residual / syy, np.where(fitted, 1.0, np.nan))
+        half_width = t_quantile(0.5 + confidence / 2, n - 2) * stderr
+    return {'slope': slope, 'intercept': intercept, 'stderr': stderr,
+            'slope_low': slope - half_width, 'slope_high': slope + half_width,
+            'r2': r2, 'n': n.astype(np.int64)}
+
+
+def grouped_trends(df, x, y, by=None, min_points=2, confidence=0.95):
+    """Fit a linear trend of ``y`` on ``x`` for every group of ``df``.
+
+    ``by`` is a column name or list of names (None fits the whole frame as
+    one group). Rows where ``x`` or ``y`` is missing are ignored. Returns one
+    row per group with the ``by`` columns followed by ``TREND_COLUMNS``;
+    groups with fewer than ``min_points`` points or a constant ``x`` get NaN
+    estimates, and ``stderr`` and the interval need at least three points.
+    """
+    keys = [] if by is None else [by] if isinstance(by, str) else list(by)
+    xs = pd.to_numeric(df[x], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    ys = pd.to_numeric(df[y], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = np.isfinite(xs) & np.isfinite(ys)
+
+    if keys:
+        grouper = df.groupby(keys, sort=True, dropna=True)
+        codes = grouper.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        valid &= codes >= 0
+        groups = grouper.size().index.to_frame(index=False)
+        n_groups = len(groups)
+    else:
+        codes = np.zeros(len(df), dtype=np.int64)
+        groups = pd.DataFrame(index=range(1))
+        n_groups = 1
+
+    stats = _fit(codes[valid], xs[valid], ys[valid], n_groups, confidence)
+    out = groups.assign(**stats)
+    too_few = out['n'].to_numpy() < max(min_points, 2)
+    if too_few.any():
+        out.loc[too_few, TREND_COLUMNS[:-1]] = np.nan
+    return out
@@ -0,0 +1,35 @@
+"""Gunicorn settings for serving the dashboard with data shared between workers.
+
+    gunicorn -c gunicorn.conf.py app:server
+
+The app is imported once in the master (``preload_app``), which loads every
+page (``PRELOAD_PAGES=all``) and returns all cached frames read-only with text
+in Arrow buffers (``CLIMATE_SHARED_FRAMES=1``, see ``components/shared.py``).
+Workers are forked from that master and share those pages copy-on-write. The
+garbage collector is kept off while loading and the loaded objects are frozen
+before each fork, so collections in the workers never write to the shared
+pages. Per-worker resident memory then stays roughly constant whatever the
+number of workers.
+"""
+import gc
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+preload_app = True
+
+os.environ.setdefault('PRELOAD_PAGES', 'all')
+os.environ.setdefault('CLIMATE_SHARED_FRAMES', '1')
+
+# Loading creates many long-lived objects; collecting them now would only
+# touch pages the workers are about to share
+gc.disable()
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far into the permanent generation
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()